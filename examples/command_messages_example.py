@@ -1,6 +1,8 @@
 """Exemplo de uso do padrão Command Messages."""
 
 import asyncio
+import logging
+import os
 from typing import Dict, Any
 
 from patterns.command_messages import (
@@ -10,13 +12,16 @@ from patterns.command_messages import (
     command
 )
 from shared.models import AgentConfig
+from shared.runtime import run, start_queue_logging
+
+logger = logging.getLogger(__name__)
 
 
 # Exemplo 1: Comandos simples com funções
 async def process_order_command(params: Dict[str, Any]) -> Dict[str, Any]:
     """Processa um pedido."""
     order_id = params.get("order_id")
-    print(f"  → Processando pedido {order_id}...")
+    logger.info("  → Processando pedido %s...", order_id)
     await asyncio.sleep(1)  # Simula processamento
     return {
         "order_id": order_id,
@@ -29,7 +34,7 @@ async def send_email_command(params: Dict[str, Any]) -> Dict[str, Any]:
     """Envia um email."""
     to = params.get("to")
     subject = params.get("subject")
-    print(f"  → Enviando email para {to}: '{subject}'...")
+    logger.info("  → Enviando email para %s: '%s'...", to, subject)
     await asyncio.sleep(0.5)  # Simula envio
     return {
         "sent": True,
@@ -41,8 +46,13 @@ async def send_email_command(params: Dict[str, Any]) -> Dict[str, Any]:
 def calculate_total_command(params: Dict[str, Any]) -> Dict[str, Any]:
     """Calcula total de itens."""
     items = params.get("items", [])
-    total = sum(item.get("price", 0) * item.get("quantity", 1) for item in items)
-    print(f"  → Calculando total de {len(items)} itens...")
+    # Soma em centavos inteiros para evitar erro de arredondamento de float
+    total_cents = 0
+    for item in items:
+        get = item.get
+        total_cents += round(get("price", 0) * 100) * get("quantity", 1)
+    total = total_cents / 100
+    logger.info("  → Calculando total de %d itens...", len(items))
     return {
         "total": total,
         "items_count": len(items),
@@ -55,7 +65,7 @@ def calculate_total_command(params: Dict[str, Any]) -> Dict[str, Any]:
 async def generate_report_handler(params: Dict[str, Any]) -> Dict[str, Any]:
     """Gera um relatório."""
     report_type = params.get("type", "summary")
-    print(f"  → Gerando relatório tipo '{report_type}'...")
+    logger.info("  → Gerando relatório tipo '%s'...", report_type)
     await asyncio.sleep(2)
     return {
         "report_id": "RPT-001",
@@ -66,7 +76,6 @@ async def generate_report_handler(params: Dict[str, Any]) -> Dict[str, Any]:
 
 async def main():
     """Exemplo principal de uso do Command Messages."""
-    
     print("=" * 60)
     print("Exemplo: Command Messages Pattern")
     print("=" * 60)
@@ -253,4 +262,11 @@ Casos de Uso:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Em modo benchmark os logs dos handlers são descartados
+    logger.disabled = bool(os.getenv("BENCHMARK"))
+    listener = start_queue_logging()
+
+    try:
+        run(main())
+    finally:
+        listener.stop()
@@ -12,13 +12,23 @@ Padrões usados:
 """
 
 import asyncio
+import logging
+import os
 import uuid
-from datetime import datetime
-from typing import Dict, Any
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Any
 
 from patterns.pipes_and_filters import Pipeline, ValidationFilter, TransformFilter, FilterAgent
 from patterns.command_messages import CommandHandler, CommandBus
 from shared.models import AgentConfig, AgentMessage, MessageType, CommandMessage
+from shared.runtime import run, start_queue_logging
+
+logger = logging.getLogger(__name__)
+
+
+def utc_now_iso() -> str:
+    """Timestamp UTC atual em formato ISO 8601 (sem sufixo de fuso, como ``utcnow()``)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
 
 
 # =============================================================================
@@ -40,22 +50,29 @@ class PriceCalculationFilter(FilterAgent):
     
     async def filter(self, message: AgentMessage):
         """Recalcula o total do pedido."""
-        modified = message.model_copy()
-        items = modified.payload.get("items", [])
+        # O Pipeline já entrega uma cópia da mensagem: o payload é alterado no lugar
+        payload = message.payload
+        items = payload.get("items", [])
         
-        total = sum(item.get("price", 0) * item.get("quantity", 1) for item in items)
-        modified.payload["calculated_total"] = total
+        # Valores monetários em centavos inteiros: comparação exata, sem epsilon
+        total_cents = 0
+        for item in items:
+            get = item.get
+            total_cents += round(get("price", 0) * 100) * get("quantity", 1)
+        total = total_cents / 100
+        payload["calculated_total"] = total
+        payload["calculated_total_cents"] = total_cents
         
         # Valida se o total informado está correto
-        informed_total = modified.payload.get("total", 0)
-        if abs(total - informed_total) > 0.01:
+        informed_total = payload.get("total", 0)
+        if total_cents != round(informed_total * 100):
             self.logger.warning(
                 f"Total informado ({informed_total}) difere do calculado ({total})"
             )
-            modified.payload["total"] = total
+            payload["total"] = total
         
         self.logger.info(f"Total calculado: R$ {total:.2f}")
-        return modified
+        return message
 
 
 class DiscountFilter(FilterAgent):
@@ -63,33 +80,42 @@ class DiscountFilter(FilterAgent):
     
     async def filter(self, message: AgentMessage):
         """Aplica desconto se aplicável."""
-        modified = message.model_copy()
-        total = modified.payload.get("total", 0)
+        payload = message.payload
+        total = payload.get("total", 0)
         
         # Regra: desconto de 10% para pedidos acima de R$ 500
         if total > 500:
             discount = total * 0.10
-            modified.payload["discount"] = discount
-            modified.payload["total_with_discount"] = total - discount
+            payload["discount"] = discount
+            payload["total_with_discount"] = total - discount
             self.logger.info(f"Desconto aplicado: R$ {discount:.2f}")
         else:
-            modified.payload["discount"] = 0
-            modified.payload["total_with_discount"] = total
+            payload["discount"] = 0
+            payload["total_with_discount"] = total
         
-        return modified
+        return message
 
 
 class EnrichmentOrderFilter(FilterAgent):
     """Enriquece pedido com informações adicionais."""
     
+    def __init__(self, config: AgentConfig, clock: Callable[[], str] = utc_now_iso):
+        """
+        Args:
+            config: Configuração do agente
+            clock: Função que retorna o timestamp de processamento (injetável em testes)
+        """
+        super().__init__(config)
+        self._clock = clock
+    
     async def filter(self, message: AgentMessage):
         """Adiciona metadata ao pedido."""
-        modified = message.model_copy()
-        modified.payload["processed_at"] = datetime.utcnow().isoformat()
-        modified.payload["status"] = "validated"
-        modified.payload["processor_version"] = "1.0"
+        payload = message.payload
+        payload["processed_at"] = self._clock()
+        payload["status"] = "validated"
+        payload["processor_version"] = "1.0"
         
-        return modified
+        return message
 
 
 # =============================================================================
@@ -101,16 +127,17 @@ async def process_payment_command(params: Dict[str, Any]) -> Dict[str, Any]:
     order_id = params.get("order_id")
     amount = params.get("amount")
     
-    print(f"  💳 Processando pagamento de R$ {amount:.2f} para pedido {order_id}")
+    logger.info("  💳 Processando pagamento de R$ %.2f para pedido %s", amount, order_id)
     await asyncio.sleep(1)  # Simula processamento
     
     # Simula aprovação
     return {
-        "payment_id": f"PAY-{uuid.uuid4().hex[:8].upper()}",
+        "payment_id": params.get("payment_id") or f"PAY-{uuid.uuid4().hex[:8].upper()}",
         "order_id": order_id,
         "amount": amount,
         "status": "approved",
-        "approved_at": datetime.utcnow().isoformat()
+        # Timestamp do lote, quando o orquestrador o fornece
+        "approved_at": params.get("timestamp") or utc_now_iso()
     }
 
 
@@ -119,11 +146,11 @@ async def reserve_inventory_command(params: Dict[str, Any]) -> Dict[str, Any]:
     order_id = params.get("order_id")
     items = params.get("items", [])
     
-    print(f"  📦 Reservando {len(items)} itens no estoque para pedido {order_id}")
+    logger.info("  📦 Reservando %d itens no estoque para pedido %s", len(items), order_id)
     await asyncio.sleep(0.5)
     
     return {
-        "reservation_id": f"RES-{uuid.uuid4().hex[:8].upper()}",
+        "reservation_id": params.get("reservation_id") or f"RES-{uuid.uuid4().hex[:8].upper()}",
         "order_id": order_id,
         "items": items,
         "status": "reserved"
@@ -135,14 +162,14 @@ async def send_confirmation_email_command(params: Dict[str, Any]) -> Dict[str, A
     order_id = params.get("order_id")
     customer_email = params.get("customer_email")
     
-    print(f"  📧 Enviando email de confirmação para {customer_email}")
+    logger.info("  📧 Enviando email de confirmação para %s", customer_email)
     await asyncio.sleep(0.3)
     
     return {
-        "email_id": f"EMAIL-{uuid.uuid4().hex[:8].upper()}",
+        "email_id": params.get("email_id") or f"EMAIL-{uuid.uuid4().hex[:8].upper()}",
         "order_id": order_id,
         "sent_to": customer_email,
-        "sent_at": datetime.utcnow().isoformat()
+        "sent_at": params.get("timestamp") or utc_now_iso()
     }
 
 
@@ -150,11 +177,11 @@ async def create_shipment_command(params: Dict[str, Any]) -> Dict[str, Any]:
     """Cria envio para o pedido."""
     order_id = params.get("order_id")
     
-    print(f"  🚚 Criando envio para pedido {order_id}")
+    logger.info("  🚚 Criando envio para pedido %s", order_id)
     await asyncio.sleep(0.7)
     
     return {
-        "shipment_id": f"SHIP-{uuid.uuid4().hex[:8].upper()}",
+        "shipment_id": params.get("shipment_id") or f"SHIP-{uuid.uuid4().hex[:8].upper()}",
         "order_id": order_id,
         "status": "pending_dispatch",
         "estimated_delivery": "3-5 dias úteis"
@@ -168,7 +195,15 @@ async def create_shipment_command(params: Dict[str, Any]) -> Dict[str, Any]:
 class OrderProcessingOrchestrator:
     """Orquestra o processamento completo de pedidos."""
     
-    def __init__(self):
+    def __init__(self, clock: Callable[[], str] = utc_now_iso):
+        """
+        Args:
+            clock: Função que retorna o timestamp usado pelo pipeline e pelos
+                comandos; passe uma que devolva um valor fixo para formatar o
+                timestamp uma única vez por lote
+        """
+        self._clock = clock
+        
         # Pipeline de validação e transformação
         self.pipeline = self._create_pipeline()
         
@@ -181,7 +216,7 @@ class OrderProcessingOrchestrator:
             OrderValidationFilter(AgentConfig(name="OrderValidation")),
             PriceCalculationFilter(AgentConfig(name="PriceCalculation")),
             DiscountFilter(AgentConfig(name="DiscountFilter")),
-            EnrichmentOrderFilter(AgentConfig(name="OrderEnrichment"))
+            EnrichmentOrderFilter(AgentConfig(name="OrderEnrichment"), clock=self._clock)
         ]
         return Pipeline(filters, name="OrderProcessingPipeline")
     
@@ -225,14 +260,20 @@ class OrderProcessingOrchestrator:
         1. Valida e transforma através do pipeline (Pipes & Filters)
         2. Executa ações através de comandos (Command Messages)
         3. Retorna resultado consolidado
+        
+        Com pedidos processados em paralelo, as linhas de progresso são
+        acumuladas em "log" no resultado, em vez de impressas diretamente,
+        para não se intercalarem com as de outros pedidos.
         """
-        print(f"\n{'='*60}")
-        print(f"Processando Pedido: {order_data['order_id']}")
-        print(f"{'='*60}\n")
+        log: List[str] = []
+        
+        log.append(f"\n{'='*60}")
+        log.append(f"Processando Pedido: {order_data['order_id']}")
+        log.append(f"{'='*60}\n")
         
         # ETAPA 1: Pipeline de Validação e Transformação
-        print("[1] Pipeline de Validação e Transformação")
-        print("-" * 60)
+        log.append("[1] Pipeline de Validação e Transformação")
+        log.append("-" * 60)
         
         message = AgentMessage(
             id=str(uuid.uuid4()),
@@ -244,74 +285,93 @@ class OrderProcessingOrchestrator:
         validated_message = await self.pipeline.process(message)
         
         if not validated_message:
-            print("❌ Pedido rejeitado na validação!\n")
-            return {"status": "rejected", "reason": "validation_failed"}
+            log.append("❌ Pedido rejeitado na validação!\n")
+            return {"status": "rejected", "reason": "validation_failed", "log": log}
         
         validated_order = validated_message.payload
-        print(f"✓ Pedido validado: Total com desconto R$ {validated_order['total_with_discount']:.2f}\n")
+        log.append(f"✓ Pedido validado: Total com desconto R$ {validated_order['total_with_discount']:.2f}\n")
         
         # ETAPA 2: Execução de Comandos
-        print("[2] Execução de Comandos")
-        print("-" * 60)
-        
-        results = {}
+        log.append("[2] Execução de Comandos")
+        log.append("-" * 60)
         
-        # 2.1. Reservar inventário
-        print("Comando: reserve_inventory")
-        inventory_response = await self.command_bus.dispatch(
-            "reserve_inventory",
-            {
-                "order_id": validated_order["order_id"],
-                "items": validated_order["items"]
-            }
-        )
-        results["inventory"] = inventory_response.result
+        # Os comandos não dependem uns dos outros após a validação,
+        # então são despachados em paralelo
+        order_id = validated_order["order_id"]
         
-        # 2.2. Processar pagamento
-        print("Comando: process_payment")
-        payment_response = await self.command_bus.dispatch(
-            "process_payment",
-            {
-                "order_id": validated_order["order_id"],
-                "amount": validated_order["total_with_discount"]
-            }
-        )
-        results["payment"] = payment_response.result
+        # Um único sorteio aleatório gera os IDs curtos de todos os comandos do pedido
+        short_ids = os.urandom(16).hex().upper()
+        timestamp = self._clock()
         
-        # 2.3. Criar envio
-        print("Comando: create_shipment")
-        shipment_response = await self.command_bus.dispatch(
-            "create_shipment",
-            {"order_id": validated_order["order_id"]}
+        log.append("Comandos: reserve_inventory, process_payment, create_shipment, send_confirmation")
+        (
+            inventory_response,
+            payment_response,
+            shipment_response,
+            email_response,
+        ) = await asyncio.gather(
+            # 2.1. Reservar inventário
+            self.command_bus.dispatch(
+                "reserve_inventory",
+                {
+                    "order_id": order_id,
+                    "items": validated_order["items"],
+                    "reservation_id": f"RES-{short_ids[0:8]}"
+                }
+            ),
+            # 2.2. Processar pagamento
+            self.command_bus.dispatch(
+                "process_payment",
+                {
+                    "order_id": order_id,
+                    "amount": validated_order["total_with_discount"],
+                    "payment_id": f"PAY-{short_ids[8:16]}",
+                    "timestamp": timestamp
+                }
+            ),
+            # 2.3. Criar envio
+            self.command_bus.dispatch(
+                "create_shipment",
+                {"order_id": order_id, "shipment_id": f"SHIP-{short_ids[16:24]}"}
+            ),
+            # 2.4. Enviar confirmação
+            self.command_bus.dispatch(
+                "send_confirmation",
+                {
+                    "order_id": order_id,
+                    "customer_email": f"customer{validated_order['customer_id']}@example.com",
+                    "email_id": f"EMAIL-{short_ids[24:32]}",
+                    "timestamp": timestamp
+                }
+            ),
         )
-        results["shipment"] = shipment_response.result
         
-        # 2.4. Enviar confirmação
-        print("Comando: send_confirmation")
-        email_response = await self.command_bus.dispatch(
-            "send_confirmation",
-            {
-                "order_id": validated_order["order_id"],
-                "customer_email": f"customer{validated_order['customer_id']}@example.com"
-            }
-        )
-        results["notification"] = email_response.result
+        results = {
+            "inventory": inventory_response.result,
+            "payment": payment_response.result,
+            "shipment": shipment_response.result,
+            "notification": email_response.result,
+        }
         
         # ETAPA 3: Resultado Consolidado
-        print("\n" + "=" * 60)
-        print("✅ Pedido Processado com Sucesso!")
-        print("=" * 60)
+        log.append("\n" + "=" * 60)
+        log.append("✅ Pedido Processado com Sucesso!")
+        log.append("=" * 60)
         
         return {
             "status": "completed",
             "order": validated_order,
-            "results": results
+            "results": results,
+            "log": log
         }
 
 
+# Número máximo de pedidos processados simultaneamente
+MAX_CONCURRENT_ORDERS = 3
+
+
 async def main():
     """Exemplo principal."""
-    
     print("=" * 60)
     print("Exemplo Completo: Sistema de Processamento de Pedidos")
     print("=" * 60)
@@ -321,8 +381,10 @@ async def main():
     print("  • Orquestração assíncrona")
     print()
     
-    # Criar orquestrador
-    orchestrator = OrderProcessingOrchestrator()
+    # Criar orquestrador; o timestamp é formatado uma única vez para o lote
+    # inteiro e reutilizado por todos os pedidos e comandos
+    batch_timestamp = utc_now_iso()
+    orchestrator = OrderProcessingOrchestrator(clock=lambda: batch_timestamp)
     
     # Processar múltiplos pedidos
     orders = [
@@ -353,9 +415,18 @@ async def main():
         }
     ]
     
-    # Processar cada pedido
-    for order in orders:
-        result = await orchestrator.process_order(order)
+    # Processar os pedidos em paralelo, limitando quantos executam ao mesmo tempo
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_ORDERS)
+    
+    async def run_order(order: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await orchestrator.process_order(order)
+    
+    results = await asyncio.gather(*(run_order(order) for order in orders))
+    
+    # Progresso e resumos impressos na ordem original dos pedidos
+    for result in results:
+        print("\n".join(result["log"]))
         
         if result["status"] == "completed":
             print(f"\n📊 Resumo do Pedido {result['order']['order_id']}:")
@@ -365,9 +436,6 @@ async def main():
             print(f"   • Email: {result['results']['notification']['email_id']}")
         
         print("\n" + "=" * 60 + "\n")
-        
-        # Pequena pausa entre pedidos
-        await asyncio.sleep(0.5)
     
     print("\n" + "=" * 60)
     print("Todos os Pedidos Processados!")
@@ -385,4 +453,11 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Em modo benchmark os logs dos handlers são descartados
+    logger.disabled = bool(os.getenv("BENCHMARK"))
+    listener = start_queue_logging()
+
+    try:
+        run(main())
+    finally:
+        listener.stop()
@@ -5,7 +5,9 @@ from datetime import datetime
 import uuid
 
 from patterns.message_queue import MessageQueueAgent, MessageProducer
+from shared.azure_clients import aclose_all
 from shared.models import AgentConfig, AgentMessage, MessageType
+from shared.runtime import run
 
 
 class CustomProcessingAgent(MessageQueueAgent):
@@ -33,7 +35,6 @@ class CustomProcessingAgent(MessageQueueAgent):
 
 async def main():
     """Exemplo principal de uso do Message Queue."""
-    
     print("=" * 60)
     print("Exemplo: Message Queue Pattern com Azure Service Bus")
     print("=" * 60)
@@ -52,22 +53,27 @@ async def main():
     # 3. Enviar algumas mensagens de teste
     print("\n[1] Enviando mensagens para a fila...")
     
+    messages = [
+        AgentMessage(
+            id=str(uuid.uuid4()),
+            type=MessageType.COMMAND,
+            source="OrderAPI",
+            payload={
+                "order_id": f"ORD-{1000 + i}",
+                "customer": f"Customer {i+1}",
+                "amount": 100.0 * (i + 1),
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        )
+        for i in range(5)
+    ]
+    
     async with MessageProducer() as producer:
-        for i in range(5):
-            message = AgentMessage(
-                id=str(uuid.uuid4()),
-                type=MessageType.COMMAND,
-                source="OrderAPI",
-                payload={
-                    "order_id": f"ORD-{1000 + i}",
-                    "customer": f"Customer {i+1}",
-                    "amount": 100.0 * (i + 1),
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-            )
-            
-            await producer.send(message)
-            print(f"   ✓ Mensagem {i+1}/5 enviada: {message.payload['order_id']}")
+        # Todas as mensagens seguem em um único lote do Service Bus
+        await producer.send_many(messages)
+    
+    for i, message in enumerate(messages, 1):
+        print(f"   ✓ Mensagem {i}/{len(messages)} enviada: {message.payload['order_id']}")
     
     print("\n[2] Iniciando processamento da fila...")
     print("    (Pressione Ctrl+C para parar)\n")
@@ -79,6 +85,7 @@ async def main():
     except KeyboardInterrupt:
         print("\n\n[3] Parando agente...")
         await agent.stop()
+        await aclose_all()
         print("    ✓ Agente parado com sucesso!\n")
 
 
@@ -91,7 +98,7 @@ if __name__ == "__main__":
     print("\n⚠️  Certifique-se de configurar o .env com suas credenciais Azure!\n")
     
     try:
-        asyncio.run(main())
+        run(main())
     except Exception as e:
         print(f"\n❌ Erro: {str(e)}")
         print("\nVerifique se:")
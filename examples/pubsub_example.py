@@ -2,9 +2,10 @@
 
 import asyncio
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 
 from patterns.pubsub import PublisherAgent, SubscriberAgent, PubSubCoordinator
+from shared.azure_clients import aclose_all
 from shared.models import AgentConfig, EventMessage
 
 
@@ -90,13 +91,16 @@ async def main():
     # 5. Publicar eventos
     print("\n[5] Publicando eventos...\n")
     
+    # Um único timestamp para o lote de eventos publicado de uma vez
+    now = datetime.now(timezone.utc).isoformat()
+    
     events = [
         {
             "name": "user_registered",
             "data": {
                 "user_id": "USR-001",
                 "email": "novo@example.com",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": now
             }
         },
         {
@@ -105,7 +109,7 @@ async def main():
                 "order_id": "ORD-1001",
                 "user_id": "USR-001",
                 "amount": 250.00,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": now
             }
         },
         {
@@ -114,16 +118,17 @@ async def main():
                 "payment_id": "PAY-5001",
                 "order_id": "ORD-1001",
                 "status": "approved",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": now
             }
         }
     ]
     
     for i, event in enumerate(events, 1):
         print(f"Evento {i}: {event['name']}")
-        await publisher.publish_event(event['name'], event['data'])
-        print(f"   ✓ Publicado\n")
-        await asyncio.sleep(1)
+    
+    # Publica todos os eventos em um único lote do Service Bus
+    await publisher.publish_events([(event['name'], event['data']) for event in events])
+    print(f"   ✓ {len(events)} eventos publicados\n")
     
     # 6. Iniciar escuta (em background)
     print("\n[6] Iniciando escuta de eventos...")
@@ -151,6 +156,7 @@ async def main():
         print("\n\n[8] Parando todos os agentes...")
         listen_task.cancel()
         await coordinator.stop_all()
+        await aclose_all()
         print("    ✓ Todos os agentes parados!\n")
     
     print("=" * 60)
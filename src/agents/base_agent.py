@@ -4,7 +4,8 @@ import asyncio
 import logging
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional, Callable
-from datetime import datetime
+from datetime import datetime, timezone
+import time
 import uuid
 
 from shared.models import AgentConfig, AgentMessage, MessageType
@@ -13,6 +14,26 @@ from shared.models import AgentConfig, AgentMessage, MessageType
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Timestamp reaproveitado dentro da mesma janela de 1 ms
+_TIMESTAMP_RESOLUTION_NS = 1_000_000
+_last_timestamp_ns = 0
+_last_timestamp = datetime.min
+
+
+def _coarse_utcnow() -> datetime:
+    """
+    Retorna o horário UTC atual com resolução de 1 ms.
+    
+    Mensagens criadas na mesma janela compartilham o mesmo datetime. O valor
+    é naive (sem tzinfo), como o default de ``AgentMessage.timestamp``.
+    """
+    global _last_timestamp_ns, _last_timestamp
+    now_ns = time.monotonic_ns()
+    if now_ns - _last_timestamp_ns >= _TIMESTAMP_RESOLUTION_NS:
+        _last_timestamp = datetime.now(timezone.utc).replace(tzinfo=None)
+        _last_timestamp_ns = now_ns
+    return _last_timestamp
+
 
 class BaseAgent(ABC):
     """
@@ -97,11 +118,11 @@ class BaseAgent(ABC):
             Nova mensagem criada
         """
         return AgentMessage(
-            id=str(uuid.uuid4()),
+            id=uuid.uuid4().hex,
             type=message_type,
             source=self.name,
             destination=destination,
-            timestamp=datetime.utcnow(),
+            timestamp=_coarse_utcnow(),
             payload=payload,
             correlation_id=correlation_id
         )
@@ -114,12 +135,10 @@ class BaseAgent(ABC):
             error: Exceção ocorrida
             message: Mensagem sendo processada quando o erro ocorreu
         """
-        self.logger.error(
-            f"Erro no agente '{self.name}': {str(error)}",
-            exc_info=True
-        )
-        if message:
-            self.logger.error(f"Mensagem problemática: {message.model_dump_json()}")
+        self.logger.error("Erro no agente '%s': %s", self.name, error, exc_info=True)
+        # Serializar a mensagem inteira só vale a pena com DEBUG habilitado
+        if message is not None and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Mensagem problemática: %s", message.model_dump_json())
     
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__}(name='{self.name}', enabled={self.enabled})>"
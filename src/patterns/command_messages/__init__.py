@@ -1,10 +1,13 @@
 """Implementação do padrão Command Messages."""
 
 import asyncio
+import inspect
 import logging
-from typing import Optional, Dict, Any, Callable
+import os
+import sys
+from collections import deque
+from typing import Optional, Dict, Any, Callable, Deque, Set, Tuple
 from datetime import datetime
-import uuid
 
 from agents.base_agent import BaseAgent
 from shared.models import (
@@ -17,6 +20,24 @@ from shared.models import (
 
 logger = logging.getLogger(__name__)
 
+# IDs pré-gerados: uma leitura de os.urandom a cada _ID_BATCH_SIZE mensagens
+_ID_BATCH_SIZE = 1024
+_id_pool: Deque[str] = deque()
+
+# O processo filho não pode herdar IDs já gerados pelo pai (fork só existe em POSIX)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_id_pool.clear)
+
+
+def _fast_uuid() -> str:
+    """Retorna um ID aleatório de 128 bits em hexadecimal (mesmo formato de uuid4().hex)."""
+    try:
+        return _id_pool.popleft()
+    except IndexError:
+        raw = os.urandom(16 * _ID_BATCH_SIZE).hex()
+        _id_pool.extend(raw[i:i + 32] for i in range(0, len(raw), 32))
+        return _id_pool.popleft()
+
 
 class CommandHandler(BaseAgent):
     """
@@ -39,8 +60,12 @@ class CommandHandler(BaseAgent):
             command_handlers: Dicionário mapeando nomes de comandos para funções
         """
         super().__init__(config)
-        self._command_handlers = command_handlers or {}
-        self.logger.info(f"Handler criado com {len(self._command_handlers)} comandos")
+        # Cada comando guarda (função, é_coroutine), resolvido uma única vez no registro
+        self._command_handlers: Dict[str, Tuple[Callable, bool]] = {
+            name: (handler, inspect.iscoroutinefunction(handler))
+            for name, handler in (command_handlers or {}).items()
+        }
+        self.logger.info("Handler criado com %d comandos", len(self._command_handlers))
     
     def register_command(self, command_name: str, handler: Callable) -> None:
         """
@@ -50,8 +75,11 @@ class CommandHandler(BaseAgent):
             command_name: Nome do comando
             handler: Função que processa o comando
         """
-        self._command_handlers[command_name] = handler
-        self.logger.info(f"Comando '{command_name}' registrado")
+        self._command_handlers[command_name] = (
+            handler,
+            inspect.iscoroutinefunction(handler)
+        )
+        self.logger.info("Comando '%s' registrado", command_name)
     
     async def process_message(self, message: AgentMessage) -> Optional[AgentMessage]:
         """
@@ -64,7 +92,7 @@ class CommandHandler(BaseAgent):
             Mensagem de resposta
         """
         if not isinstance(message, CommandMessage):
-            self.logger.warning(f"Mensagem {message.id} não é um comando")
+            self.logger.warning("Mensagem %s não é um comando", message.id)
             return self._create_error_response(
                 message,
                 "Message is not a CommandMessage"
@@ -83,30 +111,34 @@ class CommandHandler(BaseAgent):
             Resposta da execução
         """
         command_name = command.command_name
+        entry = self._command_handlers.get(command_name)
         
-        if command_name not in self._command_handlers:
-            self.logger.error(f"Comando '{command_name}' não encontrado")
+        if entry is None:
+            self.logger.error("Comando '%s' não encontrado", command_name)
             return self._create_error_response(
                 command,
                 f"Unknown command: {command_name}"
             )
         
         try:
-            self.logger.info(f"Executando comando '{command_name}' (msg: {command.id})")
+            self.logger.info("Executando comando '%s' (msg: %s)", command_name, command.id)
             
             # Executa o handler
-            handler = self._command_handlers[command_name]
-            result = handler(command.parameters)
-            
-            # Se for coroutine, aguarda
-            if asyncio.iscoroutine(result):
-                result = await result
+            handler, is_async = entry
+            if is_async:
+                result = await handler(command.parameters)
+            else:
+                result = handler(command.parameters)
+                
+                # Callables que não são funções async ainda podem retornar coroutines
+                if asyncio.iscoroutine(result):
+                    result = await result
             
             # Cria resposta de sucesso
             return self._create_success_response(command, result)
         
         except Exception as e:
-            self.logger.error(f"Erro ao executar comando '{command_name}': {str(e)}")
+            self.logger.error("Erro ao executar comando '%s': %s", command_name, e)
             return self._create_error_response(command, str(e))
     
     def _create_success_response(
@@ -115,8 +147,9 @@ class CommandHandler(BaseAgent):
         result: Any
     ) -> ResponseMessage:
         """Cria uma resposta de sucesso."""
-        return ResponseMessage(
-            id=str(uuid.uuid4()),
+        # Campos montados internamente: model_construct dispensa a revalidação
+        return ResponseMessage.model_construct(
+            id=_fast_uuid(),
             source=self.name,
             destination=command.source,
             correlation_id=command.id,
@@ -131,8 +164,8 @@ class CommandHandler(BaseAgent):
         error_message: str
     ) -> ResponseMessage:
         """Cria uma resposta de erro."""
-        return ResponseMessage(
-            id=str(uuid.uuid4()),
+        return ResponseMessage.model_construct(
+            id=_fast_uuid(),
             source=self.name,
             destination=command.source,
             correlation_id=command.id,
@@ -159,13 +192,15 @@ class CommandInvoker:
         self.name = name
         self.logger = logging.getLogger(f"CommandInvoker.{name}")
         self._pending_requests: Dict[str, asyncio.Future] = {}
+        # Referências fortes às tasks fire-and-forget (evita coleta pelo GC)
+        self._background_tasks: Set[asyncio.Task] = set()
     
     async def invoke_command(
         self,
         handler: CommandHandler,
         command_name: str,
         parameters: Dict[str, Any],
-        timeout: int = 30
+        timeout: Optional[float] = 30
     ) -> ResponseMessage:
         """
         Invoca um comando e aguarda a resposta.
@@ -174,7 +209,7 @@ class CommandInvoker:
             handler: Handler que processará o comando
             command_name: Nome do comando
             parameters: Parâmetros do comando
-            timeout: Timeout em segundos
+            timeout: Timeout em segundos (None para aguardar sem limite)
         
         Returns:
             Resposta do comando
@@ -183,35 +218,36 @@ class CommandInvoker:
             asyncio.TimeoutError: Se o timeout for excedido
         """
         # Cria o comando
-        command = CommandMessage(
-            id=str(uuid.uuid4()),
+        command = CommandMessage.model_construct(
+            id=_fast_uuid(),
             source=self.name,
             destination=handler.name,
             command_name=command_name,
             parameters=parameters
         )
         
-        self.logger.info(f"Invocando comando '{command_name}' (id: {command.id})")
+        self.logger.info("Invocando comando '%s' (id: %s)", command_name, command.id)
         
         try:
-            # Executa o comando com timeout
-            response = await asyncio.wait_for(
-                handler.execute_command(command),
-                timeout=timeout
-            )
+            if timeout is None:
+                response = await handler.execute_command(command)
+            else:
+                # Executa o comando com timeout (sem criar task extra como wait_for)
+                async with asyncio.timeout(timeout):
+                    response = await handler.execute_command(command)
             
             self.logger.info(
-                f"Comando '{command_name}' executado: {response.status}"
+                "Comando '%s' executado: %s", command_name, response.status
             )
             
             return response
         
         except asyncio.TimeoutError:
-            self.logger.error(f"Timeout ao executar comando '{command_name}'")
+            self.logger.error("Timeout ao executar comando '%s'", command_name)
             raise
         
         except Exception as e:
-            self.logger.error(f"Erro ao invocar comando: {str(e)}")
+            self.logger.error("Erro ao invocar comando: %s", e)
             raise
     
     async def invoke_async(
@@ -231,20 +267,27 @@ class CommandInvoker:
         Returns:
             ID do comando para correlação futura
         """
-        command = CommandMessage(
-            id=str(uuid.uuid4()),
+        command = CommandMessage.model_construct(
+            id=_fast_uuid(),
             source=self.name,
             destination=handler.name,
             command_name=command_name,
             parameters=parameters
         )
         
-        self.logger.info(f"Invocando comando assíncrono '{command_name}' (id: {command.id})")
+        self.logger.info("Invocando comando assíncrono '%s' (id: %s)", command_name, command.id)
         
         # Dispara o comando sem aguardar
-        asyncio.create_task(handler.execute_command(command))
+        task = asyncio.create_task(handler.execute_command(command))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
         
         return command.id
+    
+    async def wait_pending(self) -> None:
+        """Aguarda a conclusão de todos os comandos disparados com invoke_async."""
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
 
 
 class CommandBus:
@@ -257,6 +300,7 @@ class CommandBus:
     def __init__(self):
         """Inicializa o barramento de comandos."""
         self._handlers: Dict[str, CommandHandler] = {}
+        self._command_names: frozenset[str] = frozenset()
         self.logger = logging.getLogger("CommandBus")
     
     def register_handler(self, command_name: str, handler: CommandHandler) -> None:
@@ -267,8 +311,11 @@ class CommandBus:
             command_name: Nome do comando
             handler: Handler que processará o comando
         """
+        # Chaves internadas permitem que o lookup no dispatch resolva por identidade
+        command_name = sys.intern(command_name)
         self._handlers[command_name] = handler
-        self.logger.info(f"Handler '{handler.name}' registrado para comando '{command_name}'")
+        self._command_names = frozenset(self._handlers)
+        self.logger.info("Handler '%s' registrado para comando '%s'", handler.name, command_name)
     
     async def dispatch(
         self,
@@ -290,23 +337,30 @@ class CommandBus:
         Raises:
             ValueError: Se não houver handler para o comando
         """
-        if command_name not in self._handlers:
+        handler = self._handlers.get(command_name)
+        if handler is None:
             raise ValueError(f"Nenhum handler registrado para comando '{command_name}'")
         
-        handler = self._handlers[command_name]
-        
-        command = CommandMessage(
-            id=str(uuid.uuid4()),
+        command = CommandMessage.model_construct(
+            id=_fast_uuid(),
             source=source,
             destination=handler.name,
             command_name=command_name,
             parameters=parameters
         )
         
-        self.logger.info(f"Despachando comando '{command_name}' para '{handler.name}'")
+        self.logger.info("Despachando comando '%s' para '%s'", command_name, handler.name)
         
         return await handler.execute_command(command)
     
+    @property
+    def command_names(self) -> frozenset[str]:
+        """Conjunto imutável dos comandos registrados (recalculado apenas no registro)."""
+        return self._command_names
+    
+    def __contains__(self, command_name: str) -> bool:
+        return command_name in self._command_names
+    
     def list_commands(self) -> list[str]:
         """Retorna a lista de comandos registrados."""
         return list(self._handlers.keys())
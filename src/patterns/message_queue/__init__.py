@@ -1,16 +1,27 @@
 """Implementação do padrão Message Queue usando Azure Service Bus."""
 
 import asyncio
-import json
 import logging
-from typing import Optional, Callable, Any
+from typing import Optional, Callable, Any, List
 
 from azure.servicebus import ServiceBusMessage
 from azure.servicebus.aio import ServiceBusClient, ServiceBusReceiver, ServiceBusSender
+from pydantic import TypeAdapter, ValidationError
 
 from agents.base_agent import BaseAgent
 from shared.models import AgentConfig, AgentMessage, MessageType
-from shared.azure_clients import get_async_service_bus_client, get_queue_name
+from shared.azure_clients import (
+    get_async_service_bus_client,
+    get_queue_name,
+    message_body_bytes,
+    send_batched,
+    ServiceBusBatchSender
+)
+from shared.serialization import model_to_json
+
+
+# Validador construído uma única vez; valida direto dos bytes JSON
+_AGENT_MSG_ADAPTER = TypeAdapter(AgentMessage)
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +39,8 @@ class MessageQueueAgent(BaseAgent):
         config: AgentConfig,
         queue_name: Optional[str] = None,
         connection_string: Optional[str] = None,
-        max_concurrent_calls: int = 5
+        max_concurrent_calls: int = 5,
+        prefetch_count: Optional[int] = None
     ):
         """
         Inicializa o agente de fila.
@@ -38,30 +50,41 @@ class MessageQueueAgent(BaseAgent):
             queue_name: Nome da fila
             connection_string: String de conexão do Service Bus
             max_concurrent_calls: Número máximo de mensagens processadas simultaneamente
+            prefetch_count: Mensagens mantidas em buffer local pelo receiver
+                (padrão: 3x max_concurrent_calls). Mensagens em prefetch já estão
+                com o lock ativo, então valores muito altos podem expirar locks.
         """
         super().__init__(config)
         self.queue_name = queue_name or get_queue_name()
         self._client: Optional[ServiceBusClient] = None
         self._receiver: Optional[ServiceBusReceiver] = None
         self._sender: Optional[ServiceBusSender] = None
+        self._batch_sender: Optional[ServiceBusBatchSender] = None
         self._connection_string = connection_string
         self._max_concurrent_calls = max_concurrent_calls
+        self._prefetch_count = (
+            prefetch_count if prefetch_count is not None else max_concurrent_calls * 3
+        )
     
     async def on_start(self) -> None:
         """Inicializa conexões ao iniciar o agente."""
         self._client = get_async_service_bus_client(self._connection_string)
-        self._receiver = self._client.get_queue_receiver(queue_name=self.queue_name)
+        self._receiver = self._client.get_queue_receiver(
+            queue_name=self.queue_name,
+            prefetch_count=self._prefetch_count
+        )
         self._sender = self._client.get_queue_sender(queue_name=self.queue_name)
-        self.logger.info(f"Conectado à fila '{self.queue_name}'")
+        self._batch_sender = ServiceBusBatchSender(self._sender)
+        self.logger.info("Conectado à fila '%s'", self.queue_name)
     
     async def on_stop(self) -> None:
         """Fecha conexões ao parar o agente."""
         if self._receiver:
             await self._receiver.close()
+        if self._batch_sender:
+            await self._batch_sender.close()
         if self._sender:
             await self._sender.close()
-        if self._client:
-            await self._client.close()
         self.logger.info("Conexões fechadas")
     
     async def process_message(self, message: AgentMessage) -> Optional[AgentMessage]:
@@ -74,10 +97,10 @@ class MessageQueueAgent(BaseAgent):
         Returns:
             Mensagem de resposta (implementar lógica customizada)
         """
-        self.logger.info(f"Processando mensagem: {message.id}")
+        self.logger.info("Processando mensagem: %s", message.id)
         # Implementar lógica de processamento aqui
         # Este é um exemplo básico que apenas loga a mensagem
-        self.logger.info(f"Payload: {message.payload}")
+        self.logger.info("Payload: %s", message.payload)
         return None
     
     async def send_message(self, message: AgentMessage) -> None:
@@ -91,12 +114,27 @@ class MessageQueueAgent(BaseAgent):
             raise RuntimeError("Agente não foi iniciado. Chame start() primeiro.")
         
         # Serializa a mensagem
-        message_body = message.model_dump_json()
-        service_bus_message = ServiceBusMessage(message_body)
+        service_bus_message = ServiceBusMessage(model_to_json(message))
         
-        # Envia para a fila
-        await self._sender.send_messages(service_bus_message)
-        self.logger.info(f"Mensagem {message.id} enviada para a fila '{self.queue_name}'")
+        # Envia para a fila (envios concorrentes são agrupados em lote)
+        await self._batch_sender.send(service_bus_message)
+        self.logger.info("Mensagem %s enviada para a fila '%s'", message.id, self.queue_name)
+    
+    async def send_many(self, messages: List[AgentMessage]) -> None:
+        """
+        Envia várias mensagens para a fila usando lotes do Service Bus.
+        
+        Args:
+            messages: Mensagens a enviar
+        """
+        if not self._sender:
+            raise RuntimeError("Agente não foi iniciado. Chame start() primeiro.")
+        
+        sent = await send_batched(
+            self._sender,
+            [ServiceBusMessage(model_to_json(message)) for message in messages]
+        )
+        self.logger.info("%s mensagens enviadas para a fila '%s'", sent, self.queue_name)
     
     async def start_processing(self) -> None:
         """
@@ -108,32 +146,49 @@ class MessageQueueAgent(BaseAgent):
         if not self._receiver:
             await self.start()
         
-        self.logger.info(f"Iniciando processamento da fila '{self.queue_name}'")
+        self.logger.info("Iniciando processamento da fila '%s'", self.queue_name)
         
         try:
             async with self._receiver:
-                while self.is_running():
-                    # Recebe mensagens em lote
-                    received_msgs = await self._receiver.receive_messages(
-                        max_message_count=self._max_concurrent_calls,
-                        max_wait_time=5
-                    )
-                    
-                    if not received_msgs:
-                        continue
-                    
-                    # Processa mensagens em paralelo
-                    tasks = []
-                    for msg in received_msgs:
-                        task = self._process_service_bus_message(msg)
-                        tasks.append(task)
-                    
-                    await asyncio.gather(*tasks, return_exceptions=True)
+                # Recebimento e processamento sobrepostos: o próximo lote é buscado
+                # enquanto os workers ainda processam o anterior
+                queue: asyncio.Queue = asyncio.Queue(maxsize=self._max_concurrent_calls)
+                workers = [
+                    asyncio.create_task(self._consume_messages(queue))
+                    for _ in range(self._max_concurrent_calls)
+                ]
+                try:
+                    await self._fetch_messages(queue)
+                    for _ in workers:
+                        await queue.put(None)
+                    await asyncio.gather(*workers)
+                finally:
+                    for worker in workers:
+                        worker.cancel()
         
         except Exception as e:
-            self.logger.error(f"Erro no processamento da fila: {str(e)}", exc_info=True)
+            self.logger.error("Erro no processamento da fila: %s", e, exc_info=True)
             raise
     
+    async def _fetch_messages(self, queue: asyncio.Queue) -> None:
+        """Recebe lotes continuamente e os entrega aos workers pela fila interna."""
+        while self.is_running():
+            received_msgs = await self._receiver.receive_messages(
+                max_message_count=self._max_concurrent_calls,
+                max_wait_time=5
+            )
+            
+            for msg in received_msgs:
+                await queue.put(msg)
+    
+    async def _consume_messages(self, queue: asyncio.Queue) -> None:
+        """Worker que processa mensagens da fila interna até receber None."""
+        while (msg := await queue.get()) is not None:
+            try:
+                await self._process_service_bus_message(msg)
+            except Exception as e:
+                self.logger.error("Erro ao liquidar mensagem: %s", e, exc_info=True)
+    
     async def _process_service_bus_message(self, msg: Any) -> None:
         """
         Processa uma mensagem individual do Service Bus.
@@ -142,31 +197,68 @@ class MessageQueueAgent(BaseAgent):
             msg: Mensagem do Service Bus
         """
         try:
-            # Deserializa a mensagem
-            body = str(msg)
-            message_data = json.loads(body)
-            agent_message = AgentMessage(**message_data)
-            
+            body = message_body_bytes(msg)
+        except Exception as e:
+            # Sem corpo legível não há como reprocessar; liquida já em vez de
+            # esperar o lock expirar
+            self.logger.error("Erro ao ler corpo da mensagem: %s", e)
+            await self._receiver.dead_letter_message(
+                msg,
+                reason="Invalid message",
+                error_description=str(e)[:256]
+            )
+            return
+        
+        # Corpo que não pode ser um objeto JSON vai direto para dead letter,
+        # sem passar pelo validador
+        if not body or body[:1] not in b"{ \t\r\n":
+            self.logger.error("Corpo da mensagem não é um objeto JSON")
+            await self._dead_letter_invalid(msg, body)
+            return
+        
+        try:
+            # Valida direto dos bytes do corpo, sem dict intermediário
+            agent_message = _AGENT_MSG_ADAPTER.validate_json(body)
+        except ValidationError as e:
+            self.logger.error("Erro ao deserializar mensagem: %s", e)
+            await self._dead_letter_invalid(msg, body)
+            return
+        
+        # Erros do handler ou do settlement (inclusive ValidationError do
+        # código do usuário) abandonam a mensagem para nova tentativa
+        try:
             # Processa a mensagem
             result = await self.process_message(agent_message)
             
-            # Completa a mensagem (remove da fila)
+            # Completa a mensagem (remove da fila) antes de encaminhar a
+            # resposta: nenhuma resposta sai sem a mensagem estar liquidada
             await self._receiver.complete_message(msg)
-            self.logger.info(f"Mensagem {agent_message.id} processada e completada")
-            
-            # Se houver resposta, pode enviar para outra fila se necessário
-            if result:
-                await self.send_message(result)
-        
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Erro ao deserializar mensagem: {str(e)}")
-            # Marca como dead letter
-            await self._receiver.dead_letter_message(msg, reason="Invalid JSON")
+            self.logger.info("Mensagem %s processada e completada", agent_message.id)
         
         except Exception as e:
-            self.logger.error(f"Erro ao processar mensagem: {str(e)}", exc_info=True)
+            self.logger.error("Erro ao processar mensagem: %s", e, exc_info=True)
             # Abandona a mensagem para que possa ser reprocessada
             await self._receiver.abandon_message(msg)
+            return
+        
+        # Se houver resposta, pode enviar para outra fila se necessário. A
+        # mensagem já foi liquidada, então uma falha aqui não a abandona.
+        if result:
+            try:
+                await self.send_message(result)
+            except Exception as e:
+                self.logger.error(
+                    "Erro ao enviar resposta da mensagem %s: %s", agent_message.id, e,
+                    exc_info=True
+                )
+    
+    async def _dead_letter_invalid(self, msg: Any, body: bytes) -> None:
+        """Marca como dead letter, com o início do corpo para diagnóstico."""
+        await self._receiver.dead_letter_message(
+            msg,
+            reason="Invalid message",
+            error_description=body[:256].decode("utf-8", "replace")
+        )
 
 
 class MessageProducer:
@@ -193,19 +285,21 @@ class MessageProducer:
         self._connection_string = connection_string
         self._client: Optional[ServiceBusClient] = None
         self._sender: Optional[ServiceBusSender] = None
+        self._batch_sender: Optional[ServiceBusBatchSender] = None
     
     async def __aenter__(self):
         """Context manager entry."""
         self._client = get_async_service_bus_client(self._connection_string)
         self._sender = self._client.get_queue_sender(queue_name=self.queue_name)
+        self._batch_sender = ServiceBusBatchSender(self._sender)
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit."""
+        if self._batch_sender:
+            await self._batch_sender.close()
         if self._sender:
             await self._sender.close()
-        if self._client:
-            await self._client.close()
     
     async def send(self, message: AgentMessage) -> None:
         """
@@ -217,7 +311,22 @@ class MessageProducer:
         if not self._sender:
             raise RuntimeError("Produtor não inicializado. Use como context manager.")
         
-        message_body = message.model_dump_json()
-        service_bus_message = ServiceBusMessage(message_body)
-        await self._sender.send_messages(service_bus_message)
-        logger.info(f"Mensagem {message.id} enviada para '{self.queue_name}'")
+        service_bus_message = ServiceBusMessage(model_to_json(message))
+        await self._batch_sender.send(service_bus_message)
+        logger.info("Mensagem %s enviada para '%s'", message.id, self.queue_name)
+    
+    async def send_many(self, messages: List[AgentMessage]) -> None:
+        """
+        Envia várias mensagens para a fila usando lotes do Service Bus.
+        
+        Args:
+            messages: Mensagens a enviar
+        """
+        if not self._sender:
+            raise RuntimeError("Produtor não inicializado. Use como context manager.")
+        
+        sent = await send_batched(
+            self._sender,
+            [ServiceBusMessage(model_to_json(message)) for message in messages]
+        )
+        logger.info("%s mensagens enviadas para '%s'", sent, self.queue_name)
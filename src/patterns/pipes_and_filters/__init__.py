@@ -2,7 +2,7 @@
 
 import asyncio
 import logging
-from typing import List, Optional, Any, Dict
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Any, Dict, Tuple
 from abc import abstractmethod
 
 from agents.base_agent import BaseAgent
@@ -10,6 +10,31 @@ from shared.models import AgentConfig, AgentMessage, MessageType
 
 logger = logging.getLogger(__name__)
 
+# Acima deste número de filtros o pipeline usa o laço genérico em vez de gerar código
+MAX_SPECIALIZED_FILTERS = 16
+
+
+def _defining_class(cls: type, name: str) -> type:
+    """Classe da MRO que define o atributo ``name``."""
+    for klass in cls.__mro__:
+        if name in klass.__dict__:
+            return klass
+    return object
+
+
+def _uses_batch_override(filter_type: type) -> bool:
+    """
+    Indica se ``filter_batch`` pode substituir ``filter`` para o tipo de filtro.
+    
+    Só vale quando o ``filter_batch`` sobrescrito foi definido na mesma classe
+    (ou em uma subclasse) da que define ``filter``; uma subclasse que troca
+    apenas ``filter`` precisa continuar sendo chamada mensagem a mensagem.
+    """
+    batch_owner = _defining_class(filter_type, "filter_batch")
+    if batch_owner is FilterAgent:
+        return False
+    return issubclass(batch_owner, _defining_class(filter_type, "filter"))
+
 
 class FilterAgent(BaseAgent):
     """
@@ -45,13 +70,13 @@ class FilterAgent(BaseAgent):
             filtered = await self.filter(message)
             
             if filtered:
-                self.logger.info(f"Filtro '{self.name}' processou mensagem {message.id}")
+                self.logger.info("Filtro '%s' processou mensagem %s", self.name, message.id)
                 return filtered
             elif self.pass_through:
-                self.logger.info(f"Filtro '{self.name}' passou mensagem {message.id}")
+                self.logger.info("Filtro '%s' passou mensagem %s", self.name, message.id)
                 return message
             else:
-                self.logger.info(f"Filtro '{self.name}' bloqueou mensagem {message.id}")
+                self.logger.info("Filtro '%s' bloqueou mensagem %s", self.name, message.id)
                 return None
         
         except Exception as e:
@@ -70,6 +95,34 @@ class FilterAgent(BaseAgent):
             Mensagem transformada ou None para bloquear
         """
         pass
+    
+    async def filter_batch(
+        self,
+        messages: List[AgentMessage]
+    ) -> List[Optional[AgentMessage]]:
+        """
+        Aplica o filtro a um lote de mensagens.
+        
+        A implementação padrão chama ``filter`` mensagem a mensagem; filtros
+        cuja lógica vale para o lote inteiro podem sobrescrever este método
+        para processar tudo de uma vez. ``Pipeline.process_batch`` só usa
+        este método quando ele é sobrescrito.
+        
+        Args:
+            messages: Mensagens a filtrar
+        
+        Returns:
+            Lista alinhada com a entrada: a mensagem transformada ou None
+            para bloquear (erros individuais também resultam em None)
+        """
+        results: List[Optional[AgentMessage]] = []
+        for message in messages:
+            try:
+                results.append(await self.filter(message))
+            except Exception as e:
+                await self.handle_error(e, message)
+                results.append(None)
+        return results
 
 
 class ValidationFilter(FilterAgent):
@@ -89,17 +142,42 @@ class ValidationFilter(FilterAgent):
         """
         super().__init__(config, pass_through=False)
         self.required_fields = required_fields or []
+        self._required_set = frozenset(self.required_fields)
     
     async def filter(self, message: AgentMessage) -> Optional[AgentMessage]:
         """Valida se a mensagem contém os campos obrigatórios."""
+        # Caminho rápido: comparação de conjuntos feita em C sobre a view das chaves
+        if message.payload.keys() >= self._required_set:
+            return message
+        
         for field in self.required_fields:
             if field not in message.payload:
                 self.logger.warning(
-                    f"Mensagem {message.id} rejeitada: campo '{field}' ausente"
+                    "Mensagem %s rejeitada: campo '%s' ausente", message.id, field
                 )
                 return None
         
         return message
+    
+    async def filter_batch(
+        self,
+        messages: List[AgentMessage]
+    ) -> List[Optional[AgentMessage]]:
+        """Valida o lote inteiro com uma comparação de conjuntos por mensagem."""
+        required = self._required_set
+        results = [
+            message if message.payload.keys() >= required else None
+            for message in messages
+        ]
+        
+        for message, result in zip(messages, results):
+            if result is None:
+                self.logger.warning(
+                    "Mensagem %s rejeitada: campos ausentes %s",
+                    message.id, sorted(required - message.payload.keys())
+                )
+        
+        return results
 
 
 class TransformFilter(FilterAgent):
@@ -129,14 +207,11 @@ class TransformFilter(FilterAgent):
             # Aplica a transformação
             transformed_payload = self._transform_func(message.payload)
             
-            # Cria nova mensagem com payload transformado
-            transformed_message = message.model_copy()
-            transformed_message.payload = transformed_payload
-            
-            return transformed_message
+            # Cria nova mensagem com payload transformado em uma única cópia
+            return message.model_copy(update={"payload": transformed_payload})
         
         except Exception as e:
-            self.logger.error(f"Erro na transformação: {str(e)}")
+            self.logger.error("Erro na transformação: %s", e)
             return None
 
 
@@ -160,11 +235,37 @@ class EnrichmentFilter(FilterAgent):
     
     async def filter(self, message: AgentMessage) -> Optional[AgentMessage]:
         """Enriquece a mensagem com dados adicionais."""
-        enriched_message = message.model_copy()
-        enriched_message.payload.update(self.enrichment_data)
+        # Sem dados de enriquecimento não há o que copiar
+        if not self.enrichment_data:
+            return message
         
-        self.logger.info(f"Mensagem {message.id} enriquecida com {len(self.enrichment_data)} campos")
+        enriched_message = message.model_copy(
+            update={"payload": {**message.payload, **self.enrichment_data}}
+        )
+        
+        self.logger.info(
+            "Mensagem %s enriquecida com %d campos", message.id, len(self.enrichment_data)
+        )
         return enriched_message
+    
+    async def filter_batch(
+        self,
+        messages: List[AgentMessage]
+    ) -> List[Optional[AgentMessage]]:
+        """Enriquece o lote inteiro reutilizando os mesmos dados de enriquecimento."""
+        enrichment_data = self.enrichment_data
+        if not enrichment_data:
+            return list(messages)
+        
+        enriched = [
+            message.model_copy(update={"payload": {**message.payload, **enrichment_data}})
+            for message in messages
+        ]
+        
+        self.logger.info(
+            "%d mensagens enriquecidas com %d campos", len(enriched), len(enrichment_data)
+        )
+        return enriched
 
 
 class Pipeline:
@@ -175,80 +276,312 @@ class Pipeline:
     processa a mensagem e a passa para o próximo na cadeia.
     """
     
-    def __init__(self, filters: List[FilterAgent], name: str = "Pipeline"):
+    def __init__(
+        self,
+        filters: List[FilterAgent],
+        name: str = "Pipeline",
+        max_concurrency: int = 64
+    ):
         """
         Inicializa o pipeline.
         
         Args:
             filters: Lista de filtros a aplicar em sequência
             name: Nome do pipeline
+            max_concurrency: Número máximo de mensagens processadas
+                simultaneamente em ``process_batch``
         """
         self.filters = filters
         self.name = name
+        self.max_concurrency = max(1, max_concurrency)
         self.logger = logging.getLogger(f"Pipeline.{name}")
-        self.logger.info(f"Pipeline '{name}' criado com {len(filters)} filtros")
+        self._compiled: Callable[[AgentMessage], Awaitable[Optional[AgentMessage]]]
+        self.compile()
+        self.logger.info("Pipeline '%s' criado com %d filtros", name, len(filters))
+    
+    def compile(self) -> None:
+        """
+        Funde a cadeia de filtros em uma única coroutine.
+        
+        Os filtros são chamados direto via ``filter``, com a mesma semântica de
+        ``FilterAgent.process_message`` (pass_through e tratamento de erros),
+        mas sem um frame e logs extras por filtro. Filtros que sobrescrevem
+        ``process_message`` continuam passando por ele.
+        
+        Para até ``MAX_SPECIALIZED_FILTERS`` filtros, gera o código da
+        coroutine já desenrolado para a forma do pipeline (sem laço); acima
+        disso usa o laço genérico.
+        
+        ``process`` e ``process_batch`` usam a lista de filtros capturada aqui.
+        Chamado na construção e em ``add_filter``; chame novamente se a lista
+        ``filters`` for alterada diretamente.
+        """
+        steps = tuple(
+            (filter_agent, type(filter_agent).process_message is not FilterAgent.process_message)
+            for filter_agent in self.filters
+        )
+        self._steps = steps
+        
+        if len(steps) <= MAX_SPECIALIZED_FILTERS:
+            self._compiled = self._specialize(steps)
+        else:
+            self._compiled = self._generic(steps)
+    
+    def _log_filtered(self, message: AgentMessage, stage: int) -> None:
+        """Registra em debug o estágio (1-based) que descartou a mensagem."""
+        self.logger.debug(
+            "Mensagem %s filtrada no estágio %d por '%s'",
+            message.id, stage, self._steps[stage - 1][0].name
+        )
+    
+    def _generic(
+        self,
+        steps: Tuple[Tuple[FilterAgent, bool], ...]
+    ) -> Callable[[AgentMessage], Awaitable[Optional[AgentMessage]]]:
+        """Coroutine que percorre os filtros em laço; serve qualquer tamanho."""
+        log_filtered = self._log_filtered
+        
+        async def run(message: AgentMessage) -> Optional[AgentMessage]:
+            for stage, (filter_agent, custom) in enumerate(steps, 1):
+                if custom:
+                    result = await filter_agent.process_message(message)
+                else:
+                    try:
+                        result = await filter_agent.filter(message)
+                    except Exception as e:
+                        await filter_agent.handle_error(e, message)
+                        result = None
+                    if not result and filter_agent.pass_through:
+                        result = message
+                
+                if result is None:
+                    log_filtered(message, stage)
+                    return None
+                message = result
+            return message
+        
+        return run
+    
+    def _specialize(
+        self,
+        steps: Tuple[Tuple[FilterAgent, bool], ...]
+    ) -> Callable[[AgentMessage], Awaitable[Optional[AgentMessage]]]:
+        """
+        Gera uma coroutine desenrolada para a sequência de filtros.
+        
+        Cada estágio vira um bloco fixo de código, sem o laço e o
+        desempacotamento de tuplas por estágio. Métodos e ``pass_through``
+        continuam sendo lidos do filtro a cada mensagem, então o
+        comportamento é idêntico ao de ``_generic``.
+        """
+        namespace: Dict[str, Any] = {"log_filtered": self._log_filtered}
+        lines = ["async def run(message):"]
+        
+        for stage, (filter_agent, custom) in enumerate(steps, 1):
+            agent = f"agent_{stage}"
+            namespace[agent] = filter_agent
+            if custom:
+                lines.append(f"    result = await {agent}.process_message(message)")
+            else:
+                lines += [
+                    "    try:",
+                    f"        result = await {agent}.filter(message)",
+                    "    except Exception as e:",
+                    f"        await {agent}.handle_error(e, message)",
+                    "        result = None",
+                    f"    if not result and {agent}.pass_through:",
+                    "        result = message",
+                ]
+            lines += [
+                "    if result is None:",
+                f"        log_filtered(message, {stage})",
+                "        return None",
+                "    message = result",
+            ]
+        
+        lines.append("    return message")
+        exec(compile("\n".join(lines), f"<pipeline {self.name}>", "exec"), namespace)
+        return namespace["run"]
     
     async def process(self, message: AgentMessage) -> Optional[AgentMessage]:
         """
         Processa a mensagem através de todos os filtros.
         
+        A mensagem é copiada uma única vez na entrada (incluindo o dicionário
+        do payload), então os filtros podem alterar o payload diretamente sem
+        afetar a mensagem original.
+        
         Args:
             message: Mensagem inicial
         
         Returns:
             Mensagem final após todos os filtros, ou None se filtrada
         """
-        self.logger.info(f"Processando mensagem {message.id} através do pipeline")
-        
-        current_message = message
+        self.logger.debug("Processando mensagem %s através do pipeline", message.id)
         
-        for i, filter_agent in enumerate(self.filters):
-            self.logger.debug(f"Aplicando filtro {i+1}/{len(self.filters)}: {filter_agent.name}")
-            
-            current_message = await filter_agent.process_message(current_message)
-            
-            if current_message is None:
-                self.logger.info(
-                    f"Mensagem {message.id} filtrada no estágio {i+1} "
-                    f"por '{filter_agent.name}'"
-                )
-                return None
+        current_message = message.model_copy(update={"payload": dict(message.payload)})
+        current_message = await self._compiled(current_message)
         
-        self.logger.info(f"Mensagem {message.id} completou o pipeline com sucesso")
+        if current_message is not None:
+            self.logger.debug("Mensagem %s completou o pipeline com sucesso", message.id)
         return current_message
     
     async def process_batch(self, messages: List[AgentMessage]) -> List[AgentMessage]:
         """
-        Processa um lote de mensagens em paralelo.
+        Processa um lote de mensagens estágio a estágio.
+        
+        Cada filtro recebe de uma vez todas as mensagens que sobreviveram ao
+        estágio anterior. Filtros que sobrescrevem ``filter_batch`` tratam o
+        lote em uma única chamada; os demais são aplicados mensagem a
+        mensagem por um pool de no máximo ``max_concurrency`` workers. A
+        ordem das mensagens de entrada é preservada no resultado.
         
         Args:
             messages: Lista de mensagens
         
         Returns:
-            Lista de mensagens processadas (não inclui as filtradas)
+            Lista de mensagens processadas (não inclui as filtradas nem as que falharam)
         """
-        self.logger.info(f"Processando lote de {len(messages)} mensagens")
-        
-        tasks = [self.process(msg) for msg in messages]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        self.logger.info("Processando lote de %d mensagens", len(messages))
         
-        # Filtra None e exceções
-        processed = [
-            result for result in results
-            if result is not None and not isinstance(result, Exception)
+        # Mesma cópia de entrada feita em ``process``
+        batch: List[Optional[AgentMessage]] = [
+            msg.model_copy(update={"payload": dict(msg.payload)}) for msg in messages
         ]
         
+        for stage, (filter_agent, custom) in enumerate(self._steps, 1):
+            alive = [index for index, msg in enumerate(batch) if msg is not None]
+            if not alive:
+                break
+            
+            current = [batch[index] for index in alive]
+            results = await self._run_stage(filter_agent, custom, current)
+            
+            for index, msg, result in zip(alive, current, results):
+                if result is None:
+                    self._log_filtered(msg, stage)
+                batch[index] = result
+        
+        # Filtra None (mensagens filtradas ou com erro)
+        processed = [msg for msg in batch if msg is not None]
+        
         self.logger.info(
-            f"Lote processado: {len(processed)}/{len(messages)} "
-            f"mensagens passaram pelo pipeline"
+            "Lote processado: %d/%d mensagens passaram pelo pipeline",
+            len(processed), len(messages)
         )
         
         return processed
     
+    async def _run_stage(
+        self,
+        filter_agent: FilterAgent,
+        custom: bool,
+        messages: List[AgentMessage]
+    ) -> List[Optional[AgentMessage]]:
+        """Aplica um filtro a um lote, com a semântica de ``process_message``."""
+        if custom:
+            return await self._map_concurrent(filter_agent.process_message, messages)
+        
+        if _uses_batch_override(type(filter_agent)):
+            try:
+                results = await filter_agent.filter_batch(messages)
+            except Exception as e:
+                await filter_agent.handle_error(e, messages[0])
+                results = [None] * len(messages)
+        else:
+            async def apply(message: AgentMessage) -> Optional[AgentMessage]:
+                try:
+                    return await filter_agent.filter(message)
+                except Exception as e:
+                    await filter_agent.handle_error(e, message)
+                    return None
+            
+            results = await self._map_concurrent(apply, messages)
+        
+        if filter_agent.pass_through:
+            return [result or message for result, message in zip(results, messages)]
+        return [result or None for result in results]
+    
+    async def _map_concurrent(
+        self,
+        func: Callable[[AgentMessage], Awaitable[Optional[AgentMessage]]],
+        messages: List[AgentMessage]
+    ) -> List[Optional[AgentMessage]]:
+        """Aplica ``func`` ao lote com no máximo ``max_concurrency`` workers, mantendo a ordem."""
+        results: List[Optional[AgentMessage]] = [None] * len(messages)
+        pending = iter(enumerate(messages))
+        
+        async def worker() -> None:
+            # Iterador compartilhado: cada worker pega a próxima mensagem livre
+            for index, msg in pending:
+                try:
+                    results[index] = await func(msg)
+                except Exception as e:
+                    self.logger.error("Erro ao processar mensagem %s: %s", msg.id, e)
+        
+        workers = min(self.max_concurrency, len(messages))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+    
+    async def process_stream(
+        self,
+        messages: Iterable[AgentMessage]
+    ) -> AsyncIterator[AgentMessage]:
+        """
+        Processa mensagens em paralelo, entregando cada resultado assim que pronto.
+        
+        Diferente de ``process_batch``, não materializa o lote: a entrada pode
+        ser um gerador e os resultados saem na ordem em que terminam. No
+        máximo ``max_concurrency`` mensagens ficam em processamento e no
+        máximo outras tantas aguardando o consumidor.
+        
+        Args:
+            messages: Mensagens a processar (qualquer iterável)
+        
+        Yields:
+            Mensagens processadas (não inclui as filtradas nem as que falharam)
+        """
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrency)
+        finished = object()
+        pending = iter(messages)
+        
+        async def worker() -> None:
+            for msg in pending:
+                try:
+                    result = await self.process(msg)
+                except Exception as e:
+                    self.logger.error("Erro ao processar mensagem %s: %s", msg.id, e)
+                    continue
+                if result is not None:
+                    await results.put(result)
+        
+        async def run_workers() -> None:
+            try:
+                # TaskGroup cancela e aguarda os demais workers se um falhar
+                # (ex.: o iterável de entrada levantou exceção)
+                async with asyncio.TaskGroup() as group:
+                    for _ in range(self.max_concurrency):
+                        group.create_task(worker())
+            except asyncio.CancelledError:
+                # Consumidor já saiu; ninguém espera o sentinela
+                raise
+            except Exception as e:
+                self.logger.error("Erro ao consumir mensagens do lote: %s", e)
+            await results.put(finished)
+        
+        runner = asyncio.create_task(run_workers())
+        try:
+            while (result := await results.get()) is not finished:
+                yield result
+        finally:
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+    
     def add_filter(self, filter_agent: FilterAgent) -> None:
         """Adiciona um novo filtro ao final do pipeline."""
         self.filters.append(filter_agent)
-        self.logger.info(f"Filtro '{filter_agent.name}' adicionado ao pipeline")
+        self.compile()
+        self.logger.info("Filtro '%s' adicionado ao pipeline", filter_agent.name)
     
     def __repr__(self) -> str:
         filter_names = [f.name for f in self.filters]
@@ -1,20 +1,36 @@
 """Implementação do padrão Publish-Subscribe usando Azure Service Bus Topics."""
 
 import asyncio
-import json
 import logging
-from typing import Optional, List, Dict, Any, Callable
+import uuid
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Tuple
 
 from azure.servicebus import ServiceBusMessage
 from azure.servicebus.aio import ServiceBusClient, ServiceBusReceiver, ServiceBusSender
+from pydantic import TypeAdapter, ValidationError
 
 from agents.base_agent import BaseAgent
-from shared.models import AgentConfig, AgentMessage, EventMessage
+from shared.models import (
+    AgentConfig,
+    AgentMessage,
+    EventMessage,
+    MessagePriority,
+    MessageType
+)
 from shared.azure_clients import (
     get_async_service_bus_client,
     get_topic_name,
-    get_subscription_name
+    get_subscription_name,
+    message_body_bytes,
+    send_batched,
+    ServiceBusBatchSender
 )
+from shared.serialization import dumps, model_to_json
+
+
+# Validador construído uma única vez; valida direto dos bytes JSON
+_AGENT_MSG_ADAPTER = TypeAdapter(AgentMessage)
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +46,8 @@ class PublisherAgent(BaseAgent):
         self,
         config: AgentConfig,
         topic_name: Optional[str] = None,
-        connection_string: Optional[str] = None
+        connection_string: Optional[str] = None,
+        connection_pool_size: int = 1
     ):
         """
         Inicializa o agente publicador.
@@ -39,27 +56,56 @@ class PublisherAgent(BaseAgent):
             config: Configuração do agente
             topic_name: Nome do tópico
             connection_string: String de conexão do Service Bus
+            connection_pool_size: Número de clientes (conexões AMQP) usados em
+                round-robin. Cada ServiceBusClient usa uma única conexão TCP;
+                aumente apenas para publicadores de alto volume.
         """
         super().__init__(config)
         self.topic_name = topic_name or get_topic_name()
         self._connection_string = connection_string
-        self._client: Optional[ServiceBusClient] = None
-        self._sender: Optional[ServiceBusSender] = None
+        self._connection_pool_size = max(1, connection_pool_size)
+        self._clients: List[ServiceBusClient] = []
+        self._senders: List[ServiceBusSender] = []
+        self._batch_senders: List[ServiceBusBatchSender] = []
+        self._next_sender = 0
+        # Resolvido uma vez, em vez de um hasattr por publicação
+        self._has_priority_field = "priority" in AgentMessage.model_fields
     
     async def on_start(self) -> None:
         """Inicializa conexões ao iniciar."""
-        self._client = get_async_service_bus_client(self._connection_string)
-        self._sender = self._client.get_topic_sender(topic_name=self.topic_name)
-        self.logger.info(f"Publicador conectado ao tópico '{self.topic_name}'")
+        for index in range(self._connection_pool_size):
+            # A primeira conexão é a compartilhada do processo; as demais são exclusivas
+            client = get_async_service_bus_client(
+                self._connection_string, dedicated=index > 0
+            )
+            sender = client.get_topic_sender(topic_name=self.topic_name)
+            self._clients.append(client)
+            self._senders.append(sender)
+            self._batch_senders.append(ServiceBusBatchSender(sender))
+        self.logger.info(
+            "Publicador conectado ao tópico '%s' (%s conexões)",
+            self.topic_name, self._connection_pool_size
+        )
     
     async def on_stop(self) -> None:
         """Fecha conexões ao parar."""
-        if self._sender:
-            await self._sender.close()
-        if self._client:
-            await self._client.close()
+        for batch_sender in self._batch_senders:
+            await batch_sender.close()
+        for sender in self._senders:
+            await sender.close()
+        for client in self._clients[1:]:
+            await client.close()
+        self._batch_senders.clear()
+        self._senders.clear()
+        self._clients.clear()
         self.logger.info("Conexões do publicador fechadas")
     
+    def _next_index(self) -> int:
+        """Escolhe a próxima conexão do pool em round-robin."""
+        index = self._next_sender
+        self._next_sender = (index + 1) % len(self._senders)
+        return index
+    
     async def process_message(self, message: AgentMessage) -> Optional[AgentMessage]:
         """
         Processa e publica uma mensagem.
@@ -80,23 +126,42 @@ class PublisherAgent(BaseAgent):
         Args:
             message: Mensagem a publicar
         """
-        if not self._sender:
+        if not self._senders:
             await self.start()
         
-        # Serializa a mensagem
-        message_body = message.model_dump_json()
-        service_bus_message = ServiceBusMessage(message_body)
+        # Publicações concorrentes são agrupadas em um único lote pelo batch sender
+        batch_sender = self._batch_senders[self._next_index()]
+        await batch_sender.send(self._to_service_bus_message(message))
+        self.logger.info("Mensagem %s publicada no tópico '%s'", message.id, self.topic_name)
+    
+    async def publish_batch(self, messages: List[AgentMessage]) -> None:
+        """
+        Publica várias mensagens no tópico usando lotes do Service Bus.
+        
+        Args:
+            messages: Mensagens a publicar
+        """
+        if not messages:
+            return
         
-        # Adiciona propriedades para roteamento
+        if not self._senders:
+            await self.start()
+        
+        sent = await send_batched(
+            self._senders[self._next_index()],
+            [self._to_service_bus_message(message) for message in messages]
+        )
+        self.logger.info("%s mensagens publicadas no tópico '%s'", sent, self.topic_name)
+    
+    def _to_service_bus_message(self, message: AgentMessage) -> ServiceBusMessage:
+        """Serializa a mensagem e adiciona propriedades para roteamento."""
+        service_bus_message = ServiceBusMessage(model_to_json(message))
         service_bus_message.application_properties = {
             "message_type": message.type,
             "source": message.source,
-            "priority": str(message.priority) if hasattr(message, 'priority') else "normal"
+            "priority": str(message.priority) if self._has_priority_field else "normal"
         }
-        
-        # Publica no tópico
-        await self._sender.send_messages(service_bus_message)
-        self.logger.info(f"Mensagem {message.id} publicada no tópico '{self.topic_name}'")
+        return service_bus_message
     
     async def publish_event(
         self,
@@ -110,20 +175,77 @@ class PublisherAgent(BaseAgent):
             event_name: Nome do evento
             event_data: Dados do evento
         """
-        event_message = EventMessage(
+        await self.publish(self._create_event(event_name, event_data))
+    
+    async def publish_event_fast(
+        self,
+        event_name: str,
+        event_data: Dict[str, Any]
+    ) -> None:
+        """
+        Publica um evento montando o JSON diretamente, sem validação pydantic.
+        
+        Destinado a eventos gerados por código interno confiável; para dados
+        externos, use ``publish_event``. O corpo publicado tem os mesmos campos
+        de um ``EventMessage`` serializado.
+        
+        Args:
+            event_name: Nome do evento
+            event_data: Dados do evento
+        """
+        if not self._senders:
+            await self.start()
+        
+        message_id = self._generate_id()
+        body = dumps({
+            "id": message_id,
+            "type": MessageType.EVENT.value,
+            "source": self.name,
+            "destination": None,
+            "priority": MessagePriority.NORMAL.value,
+            "timestamp": datetime.utcnow().isoformat(),
+            "payload": event_data,
+            "metadata": {},
+            "correlation_id": None,
+            "event_name": event_name,
+            "event_data": event_data
+        })
+        service_bus_message = ServiceBusMessage(body)
+        service_bus_message.application_properties = {
+            "message_type": MessageType.EVENT,
+            "source": self.name,
+            "priority": str(MessagePriority.NORMAL)
+        }
+        
+        batch_sender = self._batch_senders[self._next_index()]
+        await batch_sender.send(service_bus_message)
+        self.logger.info("Mensagem %s publicada no tópico '%s'", message_id, self.topic_name)
+    
+    async def publish_events(self, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Publica vários eventos no tópico em lotes.
+        
+        Args:
+            events: Lista de pares (nome do evento, dados do evento)
+        """
+        await self.publish_batch([
+            self._create_event(event_name, event_data)
+            for event_name, event_data in events
+        ])
+    
+    def _create_event(self, event_name: str, event_data: Dict[str, Any]) -> EventMessage:
+        """Cria a mensagem de evento publicada no tópico."""
+        return EventMessage(
             id=self._generate_id(),
             source=self.name,
             event_name=event_name,
             event_data=event_data,
             payload=event_data
         )
-        
-        await self.publish(event_message)
     
     def _generate_id(self) -> str:
         """Gera um ID único para mensagem."""
-        import uuid
-        return str(uuid.uuid4())
+        return uuid.uuid4().hex
 
 
 class SubscriberAgent(BaseAgent):
@@ -139,7 +261,9 @@ class SubscriberAgent(BaseAgent):
         topic_name: Optional[str] = None,
         subscription_name: Optional[str] = None,
         connection_string: Optional[str] = None,
-        message_handler: Optional[Callable] = None
+        message_handler: Optional[Callable] = None,
+        max_message_count: int = 10,
+        prefetch_count: Optional[int] = None
     ):
         """
         Inicializa o agente assinante.
@@ -150,12 +274,20 @@ class SubscriberAgent(BaseAgent):
             subscription_name: Nome da assinatura
             connection_string: String de conexão do Service Bus
             message_handler: Função para processar mensagens recebidas
+            max_message_count: Número máximo de mensagens por recebimento
+            prefetch_count: Mensagens mantidas em buffer local pelo receiver
+                (padrão: 3x max_message_count). Mensagens em prefetch já estão
+                com o lock ativo, então valores muito altos podem expirar locks.
         """
         super().__init__(config)
         self.topic_name = topic_name or get_topic_name()
         self.subscription_name = subscription_name or f"{config.name}-subscription"
         self._connection_string = connection_string
         self._message_handler = message_handler
+        self._max_message_count = max_message_count
+        self._prefetch_count = (
+            prefetch_count if prefetch_count is not None else max_message_count * 3
+        )
         self._client: Optional[ServiceBusClient] = None
         self._receiver: Optional[ServiceBusReceiver] = None
     
@@ -164,19 +296,18 @@ class SubscriberAgent(BaseAgent):
         self._client = get_async_service_bus_client(self._connection_string)
         self._receiver = self._client.get_subscription_receiver(
             topic_name=self.topic_name,
-            subscription_name=self.subscription_name
+            subscription_name=self.subscription_name,
+            prefetch_count=self._prefetch_count
         )
         self.logger.info(
-            f"Assinante conectado ao tópico '{self.topic_name}' "
-            f"via assinatura '{self.subscription_name}'"
+            "Assinante conectado ao tópico '%s' via assinatura '%s'",
+            self.topic_name, self.subscription_name
         )
     
     async def on_stop(self) -> None:
         """Fecha conexões ao parar."""
         if self._receiver:
             await self._receiver.close()
-        if self._client:
-            await self._client.close()
         self.logger.info("Conexões do assinante fechadas")
     
     async def process_message(self, message: AgentMessage) -> Optional[AgentMessage]:
@@ -189,7 +320,7 @@ class SubscriberAgent(BaseAgent):
         Returns:
             None (assinantes processam mas não retornam)
         """
-        self.logger.info(f"Assinante '{self.name}' processando mensagem {message.id}")
+        self.logger.info("Assinante '%s' processando mensagem %s", self.name, message.id)
         
         if self._message_handler:
             try:
@@ -200,7 +331,7 @@ class SubscriberAgent(BaseAgent):
                 await self.handle_error(e, message)
         else:
             # Implementação padrão - apenas loga
-            self.logger.info(f"Mensagem recebida: {message.payload}")
+            self.logger.info("Mensagem recebida: %s", message.payload)
         
         return None
     
@@ -215,34 +346,51 @@ class SubscriberAgent(BaseAgent):
             await self.start()
         
         self.logger.info(
-            f"Iniciando escuta no tópico '{self.topic_name}' "
-            f"(assinatura: '{self.subscription_name}')"
+            "Iniciando escuta no tópico '%s' (assinatura: '%s')",
+            self.topic_name, self.subscription_name
         )
         
         try:
             async with self._receiver:
-                while self.is_running():
-                    # Recebe mensagens
-                    received_msgs = await self._receiver.receive_messages(
-                        max_message_count=10,
-                        max_wait_time=5
-                    )
-                    
-                    if not received_msgs:
-                        continue
-                    
-                    # Processa mensagens em paralelo
-                    tasks = []
-                    for msg in received_msgs:
-                        task = self._process_service_bus_message(msg)
-                        tasks.append(task)
-                    
-                    await asyncio.gather(*tasks, return_exceptions=True)
+                # Recebimento e processamento sobrepostos: o próximo lote é buscado
+                # enquanto os workers ainda processam o anterior
+                queue: asyncio.Queue = asyncio.Queue(maxsize=self._max_message_count)
+                workers = [
+                    asyncio.create_task(self._consume_messages(queue))
+                    for _ in range(self._max_message_count)
+                ]
+                try:
+                    await self._fetch_messages(queue)
+                    for _ in workers:
+                        await queue.put(None)
+                    await asyncio.gather(*workers)
+                finally:
+                    for worker in workers:
+                        worker.cancel()
         
         except Exception as e:
-            self.logger.error(f"Erro na escuta do tópico: {str(e)}", exc_info=True)
+            self.logger.error("Erro na escuta do tópico: %s", e, exc_info=True)
             raise
     
+    async def _fetch_messages(self, queue: asyncio.Queue) -> None:
+        """Recebe lotes continuamente e os entrega aos workers pela fila interna."""
+        while self.is_running():
+            received_msgs = await self._receiver.receive_messages(
+                max_message_count=self._max_message_count,
+                max_wait_time=5
+            )
+            
+            for msg in received_msgs:
+                await queue.put(msg)
+    
+    async def _consume_messages(self, queue: asyncio.Queue) -> None:
+        """Worker que processa mensagens da fila interna até receber None."""
+        while (msg := await queue.get()) is not None:
+            try:
+                await self._process_service_bus_message(msg)
+            except Exception as e:
+                self.logger.error("Erro ao liquidar mensagem: %s", e, exc_info=True)
+    
     async def _process_service_bus_message(self, msg: Any) -> None:
         """
         Processa uma mensagem individual do Service Bus.
@@ -251,25 +399,54 @@ class SubscriberAgent(BaseAgent):
             msg: Mensagem do Service Bus
         """
         try:
-            # Deserializa a mensagem
-            body = str(msg)
-            message_data = json.loads(body)
-            agent_message = AgentMessage(**message_data)
-            
+            body = message_body_bytes(msg)
+        except Exception as e:
+            # Sem corpo legível não há como reprocessar; liquida já em vez de
+            # esperar o lock expirar
+            self.logger.error("Erro ao ler corpo da mensagem: %s", e)
+            await self._receiver.dead_letter_message(
+                msg,
+                reason="Invalid message",
+                error_description=str(e)[:256]
+            )
+            return
+        
+        # Corpo que não pode ser um objeto JSON vai direto para dead letter,
+        # sem passar pelo validador
+        if not body or body[:1] not in b"{ \t\r\n":
+            self.logger.error("Corpo da mensagem não é um objeto JSON")
+            await self._dead_letter_invalid(msg, body)
+            return
+        
+        try:
+            # Valida direto dos bytes do corpo, sem dict intermediário
+            agent_message = _AGENT_MSG_ADAPTER.validate_json(body)
+        except ValidationError as e:
+            self.logger.error("Erro ao deserializar mensagem: %s", e)
+            await self._dead_letter_invalid(msg, body)
+            return
+        
+        # Erros do handler ou do settlement (inclusive ValidationError do
+        # código do usuário) abandonam a mensagem para nova tentativa
+        try:
             # Processa a mensagem
             await self.process_message(agent_message)
             
             # Completa a mensagem
             await self._receiver.complete_message(msg)
-            self.logger.debug(f"Mensagem {agent_message.id} processada e completada")
-        
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Erro ao deserializar mensagem: {str(e)}")
-            await self._receiver.dead_letter_message(msg, reason="Invalid JSON")
+            self.logger.debug("Mensagem %s processada e completada", agent_message.id)
         
         except Exception as e:
-            self.logger.error(f"Erro ao processar mensagem: {str(e)}", exc_info=True)
+            self.logger.error("Erro ao processar mensagem: %s", e, exc_info=True)
             await self._receiver.abandon_message(msg)
+    
+    async def _dead_letter_invalid(self, msg: Any, body: bytes) -> None:
+        """Marca como dead letter, com o início do corpo para diagnóstico."""
+        await self._receiver.dead_letter_message(
+            msg,
+            reason="Invalid message",
+            error_description=body[:256].decode("utf-8", "replace")
+        )
 
 
 class PubSubCoordinator:
@@ -300,28 +477,33 @@ class PubSubCoordinator:
     def add_publisher(self, publisher: PublisherAgent) -> None:
         """Adiciona um publicador ao coordenador."""
         self.publishers.append(publisher)
-        self.logger.info(f"Publicador '{publisher.name}' adicionado")
+        self.logger.info("Publicador '%s' adicionado", publisher.name)
     
     def add_subscriber(self, subscriber: SubscriberAgent) -> None:
         """Adiciona um assinante ao coordenador."""
         self.subscribers.append(subscriber)
-        self.logger.info(f"Assinante '{subscriber.name}' adicionado")
+        self.logger.info("Assinante '%s' adicionado", subscriber.name)
     
     async def start_all(self) -> None:
         """Inicia todos os publicadores e assinantes."""
         self.logger.info("Iniciando todos os agentes Pub/Sub")
         
-        # Inicia publicadores
-        for publisher in self.publishers:
-            await publisher.start()
+        # Inicia publicadores e assinantes em paralelo (inicializações independentes)
+        agents = self.publishers + self.subscribers
+        results = await asyncio.gather(
+            *(agent.start() for agent in agents),
+            return_exceptions=True
+        )
         
-        # Inicia assinantes
-        for subscriber in self.subscribers:
-            await subscriber.start()
+        for agent, result in zip(agents, results):
+            if isinstance(result, Exception):
+                self.logger.error(
+                    "Erro ao iniciar agente '%s': %s", agent.name, result
+                )
         
         self.logger.info(
-            f"{len(self.publishers)} publicadores e "
-            f"{len(self.subscribers)} assinantes iniciados"
+            "%s publicadores e %s assinantes iniciados",
+            len(self.publishers), len(self.subscribers)
         )
     
     async def stop_all(self) -> None:
@@ -342,7 +524,7 @@ class PubSubCoordinator:
             self.logger.warning("Nenhum assinante configurado")
             return
         
-        self.logger.info(f"Iniciando escuta em {len(self.subscribers)} assinantes")
+        self.logger.info("Iniciando escuta em %s assinantes", len(self.subscribers))
         
         tasks = [sub.start_listening() for sub in self.subscribers]
         await asyncio.gather(*tasks, return_exceptions=True)
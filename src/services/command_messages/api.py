@@ -6,14 +6,21 @@ Provides REST API endpoints for submitting commands and tracking status.
 
 import asyncio
 import logging
+import os
 import uuid
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
 import uvicorn
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 from shared.utils import get_project_client, load_env_config, EventHubAdapter
 from shared.mcp.fastapi_mcp import FastAPIMCP
 from main import (
@@ -22,6 +29,7 @@ from main import (
     CommandMessage,
     CommandType,
     CommandStatus,
+    TERMINAL_STATUSES,
     create_command_processor_agent,
 )
 
@@ -36,6 +44,8 @@ class CommandRequest(BaseModel):
     metadata: Optional[Dict[str, Any]] = Field(None, description="Optional metadata")
 
 
+# Response models are built with model_construct: their fields come from our
+# own CommandMessage/CommandProcessor objects, whose types are already known.
 class CommandResponse(BaseModel):
     """Response from command submission."""
     command_id: str
@@ -82,7 +92,13 @@ app = mcp_api.get_app()
 pipeline: Optional[AsyncCommandPipeline] = None
 project_client = None
 model_name = None
-processing_task = None
+processing_task: Optional[asyncio.Task] = None
+
+# Status responses of commands that reached a terminal state (LRU)
+STATUS_CACHE_SIZE = 100_000
+status_cache: "OrderedDict[str, CommandStatusResponse]" = OrderedDict()
+
+COMMAND_TYPE_VALUES = [ct.value for ct in CommandType]
 
 
 @app.on_event("startup")
@@ -95,10 +111,12 @@ async def startup_event() -> None:
         project_client = get_project_client()
         model_name = config.get("model_deployment_name", "gpt-4")
         
-        # Create Event Hub adapter (SAS key auth)
+        # Create Event Hub adapter (SAS key auth); concurrent submissions
+        # within 5 ms of each other share one batch send
         eventhub_adapter = EventHubAdapter(
             connection_string=config["eventhub_connection_string"],
             eventhub_name=config["eventhub_name"],
+            linger=0.005,
         )
         
         # Create pipeline
@@ -117,8 +135,10 @@ async def shutdown_event() -> None:
     
     if processing_task:
         processing_task.cancel()
+        await asyncio.gather(processing_task, return_exceptions=True)
     
     if pipeline and pipeline.eventhub_adapter:
+        await pipeline.flush()
         await pipeline.eventhub_adapter.close()
     
     logger.info("Command Messages API shut down")
@@ -128,7 +148,7 @@ async def shutdown_event() -> None:
 async def submit_command(request: CommandRequest) -> CommandResponse:
     """Submit a command for processing."""
     try:
-        command_id = str(uuid.uuid4())
+        command_id = uuid.uuid4().hex
         
         command = CommandMessage(
             command_id=command_id,
@@ -139,7 +159,7 @@ async def submit_command(request: CommandRequest) -> CommandResponse:
         
         await pipeline.submit_command(command)
         
-        return CommandResponse(
+        return CommandResponse.model_construct(
             command_id=command_id,
             command_type=request.command_type.value,
             status=CommandStatus.PENDING.value,
@@ -153,12 +173,17 @@ async def submit_command(request: CommandRequest) -> CommandResponse:
 @app.get("/commands/{command_id}", response_model=CommandStatusResponse)
 async def get_command_status(command_id: str) -> CommandStatusResponse:
     """Get the status of a submitted command."""
+    cached = status_cache.get(command_id)
+    if cached is not None:
+        status_cache.move_to_end(command_id)
+        return cached
+    
     command = pipeline.get_command_status(command_id)
     
     if not command:
         raise HTTPException(status_code=404, detail="Command not found")
     
-    return CommandStatusResponse(
+    response = CommandStatusResponse.model_construct(
         command_id=command.command_id,
         command_type=command.command_type.value,
         status=command.status.value,
@@ -168,6 +193,14 @@ async def get_command_status(command_id: str) -> CommandStatusResponse:
         updated_at=command.updated_at,
         metadata=command.metadata,
     )
+    
+    # Terminal states no longer change, so polls can be answered from the cache
+    if command.status in TERMINAL_STATUSES:
+        status_cache[command_id] = response
+        if len(status_cache) > STATUS_CACHE_SIZE:
+            status_cache.popitem(last=False)
+    
+    return response
 
 
 @app.post("/processors/create", response_model=ProcessorInfo)
@@ -194,10 +227,10 @@ async def create_processor(config: ProcessorConfig) -> ProcessorInfo:
         # Register with pipeline
         pipeline.register_processor(processor)
         
-        return ProcessorInfo(
+        return ProcessorInfo.model_construct(
             name=processor.name,
             agent_id=processor.agent_id,
-            command_types=[ct.value for ct in processor.command_types],
+            command_types=processor.command_type_values,
             processed_count=processor.processed_commands,
         )
     except Exception as e:
@@ -209,10 +242,10 @@ async def create_processor(config: ProcessorConfig) -> ProcessorInfo:
 async def list_processors() -> List[ProcessorInfo]:
     """List all registered processors."""
     return [
-        ProcessorInfo(
+        ProcessorInfo.model_construct(
             name=proc.name,
             agent_id=proc.agent_id,
-            command_types=[ct.value for ct in proc.command_types],
+            command_types=proc.command_type_values,
             processed_count=proc.processed_commands,
         )
         for proc in pipeline.processors
@@ -220,19 +253,18 @@ async def list_processors() -> List[ProcessorInfo]:
 
 
 @app.post("/pipeline/start")
-async def start_pipeline(background_tasks: BackgroundTasks) -> Dict[str, str]:
+async def start_pipeline() -> Dict[str, str]:
     """Start the command processing pipeline."""
     global processing_task
     
-    if processing_task:
+    if processing_task and not processing_task.done():
         return {"status": "already_running"}
     
     try:
-        async def process() -> None:
-            await pipeline.start_processing()
-        
-        background_tasks.add_task(process)
-        processing_task = True
+        # Runs for the process lifetime, independent of this request
+        processing_task = asyncio.create_task(
+            pipeline.start_processing(), name="pipeline-processor"
+        )
         
         return {"status": "started"}
     except Exception as e:
@@ -243,7 +275,7 @@ async def start_pipeline(background_tasks: BackgroundTasks) -> Dict[str, str]:
 @app.get("/command-types", response_model=List[str])
 async def list_command_types() -> List[str]:
     """List available command types."""
-    return [ct.value for ct in CommandType]
+    return COMMAND_TYPE_VALUES
 
 
 # Preset processor configurations
@@ -300,6 +332,8 @@ if __name__ == "__main__":
         "api:app",
         host="0.0.0.0",
         port=8003,
-        reload=True,
+        # Auto-reload is for local development only
+        reload=os.getenv("API_RELOAD", "").lower() in ("1", "true"),
+        loop="uvloop" if uvloop else "asyncio",
         log_level="info",
     )
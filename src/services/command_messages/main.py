@@ -13,18 +13,18 @@ Key Features:
 
 import asyncio
 import logging
-import json
-from typing import Any, Dict, List, Optional
-from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import uuid
+from collections import OrderedDict
 
 from azure.eventhub import EventData
 from azure.ai.projects import AIProjectClient
 from azure.ai.agents.models import MessageRole
 
-from shared.utils import get_project_client, load_env_config, EventHubAdapter
+from shared.serialization import dumps, loads
+from shared.utils import get_project_client, load_env_config, EventHubAdapter, event_body_bytes, iso_now
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -48,6 +48,14 @@ class CommandStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+# Statuses a command never leaves
+TERMINAL_STATUSES = frozenset({
+    CommandStatus.COMPLETED,
+    CommandStatus.FAILED,
+    CommandStatus.CANCELLED,
+})
+
+
 @dataclass
 class CommandMessage:
     """A command message with parameters and metadata."""
@@ -57,8 +65,8 @@ class CommandMessage:
     status: CommandStatus = CommandStatus.PENDING
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
-    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
-    updated_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    created_at: str = field(default_factory=iso_now)
+    updated_at: str = field(default_factory=iso_now)
     metadata: Dict[str, Any] = field(default_factory=dict)
     
     def to_dict(self) -> Dict[str, Any]:
@@ -85,21 +93,27 @@ class CommandMessage:
             status=CommandStatus(data.get("status", "pending")),
             result=data.get("result"),
             error=data.get("error"),
-            created_at=data.get("created_at", datetime.utcnow().isoformat()),
-            updated_at=data.get("updated_at", datetime.utcnow().isoformat()),
+            created_at=data.get("created_at", iso_now()),
+            updated_at=data.get("updated_at", iso_now()),
             metadata=data.get("metadata", {}),
         )
     
     def update_status(self, status: CommandStatus, error: Optional[str] = None) -> None:
         """Update command status."""
         self.status = status
-        self.updated_at = datetime.utcnow().isoformat()
+        self.updated_at = iso_now()
         if error:
             self.error = error
 
 
 class CommandProcessor:
-    """An AI agent that processes specific command types."""
+    """An AI agent that processes specific command types.
+    
+    Commands run on a pool of up to ``max_threads`` agent threads, so that
+    many commands can be processed at once and no single conversation
+    history keeps growing with every command. With ``stateless=True`` each
+    command gets a fresh thread that is deleted afterwards.
+    """
     
     def __init__(
         self,
@@ -108,27 +122,86 @@ class CommandProcessor:
         agent_id: str,
         command_types: List[CommandType],
         processing_instructions: str,
+        max_threads: int = 4,
+        stateless: bool = False,
     ):
         self.name = name
         self.project_client = project_client
         self.agent_id = agent_id
-        self.command_types = command_types
+        self.command_types = frozenset(command_types)
+        # Serialized form reused by the API (a list: ProcessorInfo.command_types is List[str])
+        self.command_type_values = [ct.value for ct in command_types]
         self.processing_instructions = processing_instructions
-        self.thread_id = None
+        self.max_threads = max(1, max_threads)
+        self.stateless = stateless
+        # Idle agent threads; each one is used by a single run at a time
+        self.thread_pool: asyncio.Queue[str] = asyncio.Queue()
+        self._threads_created = 0
         self.processed_commands = 0
     
-    def _initialize_thread(self) -> str:
-        """Initialize conversation thread."""
-        if not self.thread_id:
-            thread = self.project_client.agents.create_thread()
-            self.thread_id = thread.id
-            logger.info(f"Processor '{self.name}' created thread: {self.thread_id}")
-        return self.thread_id
+    def _create_thread(self) -> str:
+        """Create a conversation thread (blocking)."""
+        thread = self.project_client.agents.create_thread()
+        logger.info(f"Processor '{self.name}' created thread: {thread.id}")
+        return thread.id
+    
+    def _delete_thread(self, thread_id: str) -> None:
+        """Delete a conversation thread (blocking); failures are only logged."""
+        try:
+            self.project_client.agents.delete_thread(thread_id)
+        except Exception as e:
+            logger.warning(f"Processor '{self.name}' could not delete thread {thread_id}: {e}")
+    
+    async def _acquire_thread(self) -> str:
+        """Take an idle thread from the pool, creating one while below max_threads."""
+        if self.thread_pool.empty() and self._threads_created < self.max_threads:
+            self._threads_created += 1
+            try:
+                return await asyncio.to_thread(self._create_thread)
+            except Exception:
+                self._threads_created -= 1
+                raise
+        return await self.thread_pool.get()
     
     def can_process(self, command: CommandMessage) -> bool:
         """Check if this processor can handle the command."""
         return command.command_type in self.command_types
     
+    def _run_agent(self, thread_id: str, prompt: str) -> Tuple[str, Optional[str]]:
+        """
+        Send the prompt to the agent on the given thread and wait for its run (blocking).
+        
+        Returns:
+            The run status and the assistant's reply, or None if there is none
+        """
+        # Send message
+        self.project_client.agents.create_message(
+            thread_id=thread_id,
+            role=MessageRole.USER,
+            content=prompt,
+        )
+        
+        # Run agent
+        run = self.project_client.agents.create_and_process_run(
+            thread_id=thread_id,
+            assistant_id=self.agent_id,
+        )
+        
+        if run.status != "completed":
+            return run.status, None
+        
+        # Only the newest message is needed, not the whole thread history
+        messages = self.project_client.agents.list_messages(
+            thread_id=thread_id,
+            limit=1,
+            order="desc",
+        )
+        latest = messages.data[0] if messages.data else None
+        
+        if latest is None or latest.role != MessageRole.ASSISTANT:
+            return run.status, None
+        return run.status, latest.content[0].text.value
+    
     async def process_command(self, command: CommandMessage) -> CommandMessage:
         """
         Process a command using the AI agent.
@@ -162,7 +235,7 @@ class CommandProcessor:
             Command ID: {command.command_id}
             
             Parameters:
-            {json.dumps(command.parameters, indent=2)}
+            {dumps(command.parameters).decode()}
             
             Please execute this command and provide:
             1. The execution result
@@ -173,51 +246,41 @@ class CommandProcessor:
             Format your response as structured data that can be parsed.
             """
             
-            # Initialize thread
-            thread_id = self._initialize_thread()
-            
-            # Send message
-            self.project_client.agents.create_message(
-                thread_id=thread_id,
-                role=MessageRole.USER,
-                content=prompt,
-            )
-            
-            # Run agent
-            run = self.project_client.agents.create_and_process_run(
-                thread_id=thread_id,
-                assistant_id=self.agent_id,
-            )
+            # The agents client is synchronous; run it in a worker thread so
+            # other commands keep being dispatched meanwhile
+            if self.stateless:
+                thread_id = await asyncio.to_thread(self._create_thread)
+                try:
+                    status, response = await asyncio.to_thread(self._run_agent, thread_id, prompt)
+                finally:
+                    await asyncio.to_thread(self._delete_thread, thread_id)
+            else:
+                thread_id = await self._acquire_thread()
+                try:
+                    status, response = await asyncio.to_thread(self._run_agent, thread_id, prompt)
+                finally:
+                    self.thread_pool.put_nowait(thread_id)
             
-            if run.status == "completed":
-                messages = self.project_client.agents.list_messages(thread_id=thread_id)
-                assistant_messages = [
-                    msg for msg in messages.data 
-                    if msg.role == MessageRole.ASSISTANT
-                ]
+            if response is not None:
+                # Update command with results
+                command.result = {
+                    "processor": self.name,
+                    "response": response,
+                    "execution_time": iso_now(),
+                }
+                command.update_status(CommandStatus.COMPLETED)
+                self.processed_commands += 1
                 
-                if assistant_messages:
-                    response = assistant_messages[0].content[0].text.value
-                    
-                    # Update command with results
-                    command.result = {
-                        "processor": self.name,
-                        "response": response,
-                        "execution_time": datetime.utcnow().isoformat(),
-                    }
-                    command.update_status(CommandStatus.COMPLETED)
-                    self.processed_commands += 1
-                    
-                    logger.info(
-                        f"Processor '{self.name}' completed command "
-                        f"{command.command_id}"
-                    )
-                    return command
+                logger.info(
+                    f"Processor '{self.name}' completed command "
+                    f"{command.command_id}"
+                )
+                return command
             
             # Handle failures
             command.update_status(
                 CommandStatus.FAILED,
-                f"Agent run status: {run.status}"
+                f"Agent run status: {status}"
             )
             return command
             
@@ -232,24 +295,46 @@ class CommandProcessor:
 
 
 class AsyncCommandPipeline:
-    """Asynchronous pipeline for processing commands."""
+    """Asynchronous pipeline for processing commands.
+    
+    Command state is kept in memory in two LRU maps: ``command_store``
+    holds up to ``max_stored_commands`` commands that are still in flight,
+    and finished commands move to a separate map of the ``max_completed_commands``
+    most recent ones. The oldest entries are evicted once a map is full.
+    """
     
     def __init__(
         self,
         name: str,
         eventhub_adapter: EventHubAdapter,
+        max_inflight_sends: int = 1000,
+        max_concurrent_commands: int = 16,
+        max_stored_commands: int = 10_000,
+        max_completed_commands: int = 10_000,
     ):
         self.name = name
         self.eventhub_adapter = eventhub_adapter
         self.processors: List[CommandProcessor] = []
-        self.command_store: Dict[str, CommandMessage] = {}
+        # First registered processor for each command type
+        self._processor_by_type: Dict[CommandType, CommandProcessor] = {}
+        self.command_store: "OrderedDict[str, CommandMessage]" = OrderedDict()
+        self._recent_completed: "OrderedDict[str, CommandMessage]" = OrderedDict()
+        self.max_stored_commands = max_stored_commands
+        self.max_completed_commands = max_completed_commands
+        # Event Hub sends that have been scheduled but not yet acknowledged
+        self._inflight: Set[asyncio.Task] = set()
+        self._send_slots = asyncio.Semaphore(max_inflight_sends)
+        # Commands being processed by agents at the same time
+        self._command_slots = asyncio.Semaphore(max_concurrent_commands)
     
     def register_processor(self, processor: CommandProcessor) -> None:
         """Register a command processor."""
         self.processors.append(processor)
+        for command_type in processor.command_types:
+            self._processor_by_type.setdefault(command_type, processor)
         logger.info(
             f"Registered processor '{processor.name}' for commands: "
-            f"{[ct.value for ct in processor.command_types]}"
+            f"{processor.command_type_values}"
         )
     
     async def submit_command(self, command: CommandMessage) -> str:
@@ -265,35 +350,123 @@ class AsyncCommandPipeline:
         logger.info(f"Submitting command: {command.command_id} ({command.command_type})")
         
         # Store command
-        self.command_store[command.command_id] = command
+        self._store(command)
         
         # Send to Event Hub
-        await self.eventhub_adapter.send_event(command.to_dict())
+        await self._publish(command)
         
         return command.command_id
     
+    async def submit_commands(self, commands: List[CommandMessage]) -> List[str]:
+        """
+        Submit several commands with as few Event Hub batch sends as possible.
+        
+        Args:
+            commands: The commands to submit
+            
+        Returns:
+            Command IDs for tracking, in submission order
+        """
+        logger.info(f"Submitting {len(commands)} commands")
+        
+        for command in commands:
+            self._store(command)
+        
+        await self.eventhub_adapter.send_events(command.to_dict() for command in commands)
+        
+        return [command.command_id for command in commands]
+    
+    async def _publish(self, command: CommandMessage) -> None:
+        """
+        Schedule sending the command to Event Hub without waiting for the ack.
+        
+        Only waits when max_inflight_sends sends are already outstanding.
+        Failed sends are logged when they complete.
+        """
+        await self._send_slots.acquire()
+        task = asyncio.create_task(
+            self.eventhub_adapter.send_event(command.to_dict()),
+            name=f"send-{command.command_id}",
+        )
+        self._inflight.add(task)
+        task.add_done_callback(self._on_send_done)
+    
+    def _on_send_done(self, task: asyncio.Task) -> None:
+        """Release the send slot and report failures of a finished send."""
+        self._inflight.discard(task)
+        self._send_slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                f"Event Hub send '{task.get_name()}' failed: {task.exception()}"
+            )
+    
+    async def flush(self) -> None:
+        """Wait until every scheduled Event Hub send has completed."""
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+    
+    def _store(self, command: CommandMessage) -> None:
+        """Record the command's latest state, evicting the oldest entries when full."""
+        command_id = command.command_id
+        if command.status in TERMINAL_STATUSES:
+            self.command_store.pop(command_id, None)
+            store, limit = self._recent_completed, self.max_completed_commands
+        else:
+            store, limit = self.command_store, self.max_stored_commands
+        
+        store[command_id] = command
+        store.move_to_end(command_id)
+        if len(store) > limit:
+            store.popitem(last=False)
+    
     def get_command_status(self, command_id: str) -> Optional[CommandMessage]:
         """Get the status of a command."""
-        return self.command_store.get(command_id)
+        command = self.command_store.get(command_id)
+        if command is None:
+            command = self._recent_completed.get(command_id)
+        return command
     
-    async def _process_event(self, event: EventData) -> None:
-        """Process a command from Event Hub."""
-        try:
-            # Parse command
-            command_data = json.loads(event.body_as_str())
-            command = CommandMessage.from_dict(command_data)
+    async def _process_batch(self, events: List[EventData]) -> None:
+        """
+        Process a batch of commands from Event Hub.
+        
+        Commands are grouped by type so the processor is looked up once per
+        group, then dispatched concurrently (at most max_concurrent_commands
+        at a time across batches).
+        """
+        groups: Dict[CommandType, List[CommandMessage]] = {}
+        
+        for event in events:
+            try:
+                command = CommandMessage.from_dict(loads(event_body_bytes(event)))
+            except Exception as e:
+                logger.error(f"Error parsing command event: {e}", exc_info=True)
+                continue
             
-            # Skip if already processing or completed
-            if command.status in [CommandStatus.PROCESSING, CommandStatus.COMPLETED]:
-                return
+            # Skip if already processing or finished (the pipeline reads back
+            # the results it publishes; terminal states are never revisited)
+            if command.status is CommandStatus.PROCESSING or command.status in TERMINAL_STATUSES:
+                continue
             
-            logger.info(f"Processing command: {command.command_id}")
-            
-            # Find processor
-            processor = next(
-                (p for p in self.processors if p.can_process(command)),
-                None
+            groups.setdefault(command.command_type, []).append(command)
+        
+        dispatches = []
+        for command_type, commands in groups.items():
+            processor = self._processor_by_type.get(command_type)
+            dispatches.extend(
+                self._process_command(processor, command) for command in commands
             )
+        
+        await asyncio.gather(*dispatches)
+    
+    async def _process_command(
+        self,
+        processor: Optional[CommandProcessor],
+        command: CommandMessage,
+    ) -> None:
+        """Run one command through its processor and publish the result."""
+        try:
+            logger.info(f"Processing command: {command.command_id}")
             
             if not processor:
                 logger.warning(
@@ -305,21 +478,22 @@ class AsyncCommandPipeline:
                 )
             else:
                 # Process command
-                command = await processor.process_command(command)
+                async with self._command_slots:
+                    command = await processor.process_command(command)
             
             # Update command store
-            self.command_store[command.command_id] = command
+            self._store(command)
             
             # Send result back to Event Hub
-            await self.eventhub_adapter.send_event(command.to_dict())
+            await self._publish(command)
             
         except Exception as e:
-            logger.error(f"Error processing event: {e}", exc_info=True)
+            logger.error(f"Error processing command {command.command_id}: {e}", exc_info=True)
     
     async def start_processing(self) -> None:
         """Start processing commands from Event Hub."""
         logger.info(f"Pipeline '{self.name}' starting command processing...")
-        await self.eventhub_adapter.receive_events(self._process_event)
+        await self.eventhub_adapter.receive_event_batches(self._process_batch)
 
 
 async def create_command_processor_agent(
@@ -344,10 +518,12 @@ async def demo_command_pipeline() -> None:
     client = get_project_client()
     model = config.get("model_deployment_name", "gpt-4")
     
-    # Create Event Hub adapter (SAS key auth)
+    # Create Event Hub adapter (SAS key auth); results published by concurrent
+    # commands within 10 ms of each other share one batch send
     eventhub_adapter = EventHubAdapter(
         connection_string=config["eventhub_connection_string"],
         eventhub_name=config["eventhub_name"],
+        linger=0.01,
     )
     
     # Create pipeline
@@ -433,9 +609,7 @@ async def demo_command_pipeline() -> None:
     ]
     
     # Submit commands
-    for cmd in commands:
-        await pipeline.submit_command(cmd)
-        await asyncio.sleep(1)
+    await pipeline.submit_commands(commands)
     
     # Start processing
     try:
@@ -443,6 +617,7 @@ async def demo_command_pipeline() -> None:
     except KeyboardInterrupt:
         logger.info("Shutting down...")
     finally:
+        await pipeline.flush()
         await eventhub_adapter.close()
 
 
@@ -8,14 +8,14 @@ and monitoring agent activity.
 import asyncio
 import logging
 import json
+import uuid
 from typing import Any, Dict
-from datetime import datetime
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from pydantic import BaseModel, Field
 import uvicorn
 
-from shared.utils import get_project_client, load_env_config, EventHubAdapter
+from shared.utils import get_project_client, load_env_config, EventHubAdapter, iso_now
 from shared.mcp.fastapi_mcp import FastAPIMCP, MessageRequest, MessageResponse
 from main import create_queue_agent, MessageQueueAgent
 
@@ -81,14 +81,15 @@ async def shutdown_event() -> None:
 async def send_to_queue(request: QueueTaskRequest) -> QueueTaskResponse:
     """Send a task to the message queue."""
     try:
-        message_id = f"msg_{datetime.utcnow().timestamp()}"
+        # Random IDs: float timestamps collide under concurrent requests
+        message_id = f"msg_{uuid.uuid4().hex}"
         
         message_data = {
             "id": message_id,
             "task": request.task,
             "data": request.data,
             "priority": request.priority,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": iso_now(),
         }
         
         # Send to Event Hub
@@ -14,15 +14,14 @@ Key Features:
 import asyncio
 import logging
 import os
-import json
 from typing import Any, Dict
-from datetime import datetime
 
 from azure.eventhub import EventData
 from azure.ai.projects import AIProjectClient
 from azure.ai.agents.models import MessageRole
 
-from shared.utils import get_project_client, load_env_config, EventHubAdapter
+from shared.serialization import dumps, loads
+from shared.utils import get_project_client, load_env_config, EventHubAdapter, event_body_bytes, iso_now
 from shared.mcp import MCPMessage
 from shared.mcp.fastapi_mcp import FastAPIMCP
 
@@ -64,7 +63,7 @@ class MessageQueueAgent:
         """
         try:
             # Parse event data
-            message_data = json.loads(event.body_as_str())
+            message_data = loads(event_body_bytes(event))
             logger.info(f"Processing message: {message_data}")
             
             # Prepare context for the agent
@@ -75,7 +74,7 @@ class MessageQueueAgent:
             prompt = f"""
             Task: {task_description}
             
-            Data: {json.dumps(task_data, indent=2)}
+            Data: {dumps(task_data).decode()}
             
             Please analyze this task and provide:
             1. Your understanding of the task
@@ -102,22 +101,22 @@ class MessageQueueAgent:
             
             # Get agent's response
             if run.status == "completed":
-                messages = self.project_client.agents.list_messages(thread_id=thread_id)
+                # Get the latest message only, not the whole thread history
+                messages = self.project_client.agents.list_messages(
+                    thread_id=thread_id,
+                    limit=1,
+                    order="desc",
+                )
+                latest = messages.data[0] if messages.data else None
                 
-                # Get the latest assistant message
-                assistant_messages = [
-                    msg for msg in messages.data 
-                    if msg.role == MessageRole.ASSISTANT
-                ]
-                
-                if assistant_messages:
-                    response_content = assistant_messages[0].content[0].text.value
+                if latest is not None and latest.role == MessageRole.ASSISTANT:
+                    response_content = latest.content[0].text.value
                     
                     result = {
                         "status": "success",
                         "message_id": message_data.get("id", "unknown"),
                         "agent_response": response_content,
-                        "timestamp": datetime.utcnow().isoformat(),
+                        "timestamp": iso_now(),
                         "thread_id": thread_id,
                     }
                     
@@ -129,7 +128,7 @@ class MessageQueueAgent:
                 "status": "error",
                 "message_id": message_data.get("id", "unknown"),
                 "error": f"Run status: {run.status}",
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": iso_now(),
             }
             
         except Exception as e:
@@ -137,7 +136,7 @@ class MessageQueueAgent:
             return {
                 "status": "error",
                 "error": str(e),
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": iso_now(),
             }
     
     async def start_monitoring(self) -> None:
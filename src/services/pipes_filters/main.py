@@ -13,29 +13,55 @@ Key Features:
 
 import asyncio
 import logging
-from typing import Any, Dict, List, Optional, Callable
-from datetime import datetime
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Callable, Tuple
 from dataclasses import dataclass, field
 
 from azure.ai.projects import AIProjectClient
 from azure.ai.agents.models import MessageRole
 
-from shared.utils import get_project_client, load_env_config
+from shared.utils import get_project_client, iso_from_ns, load_env_config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Run polling starts fast and backs off (the SDK's create_and_process_run polls every 1s)
+RUN_POLL_INITIAL_INTERVAL = 0.05
+RUN_POLL_MAX_INTERVAL = 1.0
+ACTIVE_RUN_STATUSES = frozenset({"queued", "in_progress", "cancelling"})
 
-@dataclass
+PROMPT_SUFFIX = "\n\nPlease process this data according to your instructions."
+
+
+@dataclass(slots=True)
 class PipelineData:
     """Data flowing through the pipeline."""
     content: Any
     metadata: Dict[str, Any] = field(default_factory=dict)
-    transformations: List[str] = field(default_factory=list)
+    # Parallel arrays: filter names and UTC epoch nanoseconds, rendered only when read
+    transformation_names: List[str] = field(default_factory=list)
+    transformation_timestamps: array = field(default_factory=lambda: array("q"))
+    # Rendered strings of the first len(_rendered) entries; the arrays are append-only
+    _rendered: List[str] = field(default_factory=list, init=False, repr=False, compare=False)
     
     def add_transformation(self, filter_name: str) -> None:
         """Record a transformation."""
-        self.transformations.append(f"{filter_name} @ {datetime.utcnow().isoformat()}")
+        self.transformation_names.append(filter_name)
+        self.transformation_timestamps.append(time.time_ns())
+    
+    def copy_transformations(self) -> Tuple[List[str], array]:
+        """Copy both transformation arrays (the timestamp copy is a flat memcpy)."""
+        return self.transformation_names.copy(), array("q", self.transformation_timestamps)
+    
+    @property
+    def transformations(self) -> List[str]:
+        """Applied transformations as "<filter> @ <ISO timestamp>" strings."""
+        rendered = self._rendered
+        names, timestamps = self.transformation_names, self.transformation_timestamps
+        for index in range(len(rendered), len(names)):
+            rendered.append(f"{names[index]} @ {iso_from_ns(timestamps[index])}")
+        return rendered.copy()
 
 
 class CognitiveFilter:
@@ -47,21 +73,68 @@ class CognitiveFilter:
         project_client: AIProjectClient,
         agent_id: str,
         instructions: str,
+        max_runs_per_thread: int = 10,
     ):
         self.name = name
         self.project_client = project_client
         self.agent_id = agent_id
         self.instructions = instructions
+        self._prompt_prefix = f"{instructions}\n\nInput Data:\n"
+        self.max_runs_per_thread = max_runs_per_thread
         self.thread_id = None
+        self._thread_runs = 0
+        # The agent thread accepts one active run at a time, and the reply is
+        # read as the thread's newest message: start, wait and read must not
+        # interleave between concurrent process() calls
+        self._run_lock = asyncio.Lock()
     
     def _initialize_thread(self) -> str:
-        """Initialize conversation thread."""
+        """Initialize conversation thread, recycling it after max_runs_per_thread runs."""
+        if self.thread_id and self._thread_runs >= self.max_runs_per_thread:
+            # Bound the history (and token cost) the agent sees on every run
+            self.project_client.agents.delete_thread(self.thread_id)
+            logger.info("Filter '%s' deleted thread: %s", self.name, self.thread_id)
+            self.thread_id = None
+        
         if not self.thread_id:
             thread = self.project_client.agents.create_thread()
             self.thread_id = thread.id
-            logger.info(f"Filter '{self.name}' created thread: {self.thread_id}")
+            self._thread_runs = 0
+            logger.info("Filter '%s' created thread: %s", self.name, self.thread_id)
         return self.thread_id
     
+    async def warmup(self) -> None:
+        """Create the conversation thread ahead of the first run."""
+        async with self._run_lock:
+            await asyncio.to_thread(self._initialize_thread)
+    
+    def _start_run(self, prompt: str) -> Any:
+        """Ensure a thread exists and start a run with the prompt (blocking SDK calls)."""
+        thread_id = self._initialize_thread()
+        self._thread_runs += 1
+        
+        # Run agent, sending the prompt in the same request
+        return self.project_client.agents.create_run(
+            thread_id=thread_id,
+            assistant_id=self.agent_id,
+            additional_messages=[
+                {"role": MessageRole.USER, "content": prompt}
+            ],
+        )
+    
+    async def _wait_for_run(self, thread_id: str, run: Any) -> Any:
+        """Poll a run with exponential backoff until it leaves the active states."""
+        interval = RUN_POLL_INITIAL_INTERVAL
+        while run.status in ACTIVE_RUN_STATUSES:
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, RUN_POLL_MAX_INTERVAL)
+            run = await asyncio.to_thread(
+                self.project_client.agents.get_run,
+                thread_id=thread_id,
+                run_id=run.id,
+            )
+        return run
+    
     async def process(self, data: PipelineData) -> PipelineData:
         """
         Process data through this filter using AI agent.
@@ -72,64 +145,58 @@ class CognitiveFilter:
         Returns:
             Transformed pipeline data
         """
-        logger.info(f"Filter '{self.name}' processing data")
+        logger.info("Filter '%s' processing data", self.name)
         
         try:
             # Create prompt with context
-            prompt = f"""
-            {self.instructions}
+            prompt = "".join((
+                self._prompt_prefix,
+                str(data.content),
+                "\n\nPrevious Transformations:\n",
+                "\n".join(data.transformations) if data.transformation_names else "None",
+                PROMPT_SUFFIX,
+            ))
             
-            Input Data:
-            {data.content}
+            agents = self.project_client.agents
             
-            Previous Transformations:
-            {chr(10).join(data.transformations) if data.transformations else 'None'}
-            
-            Please process this data according to your instructions.
-            """
-            
-            # Initialize thread
-            thread_id = self._initialize_thread()
-            
-            # Send message
-            self.project_client.agents.create_message(
-                thread_id=thread_id,
-                role=MessageRole.USER,
-                content=prompt,
-            )
-            
-            # Run agent
-            run = self.project_client.agents.create_and_process_run(
-                thread_id=thread_id,
-                assistant_id=self.agent_id,
-            )
+            # The SDK client is synchronous: run its calls in worker threads so
+            # concurrent filters and pipelines overlap their HTTP I/O. Thread
+            # setup and run creation share a single worker-thread hop.
+            async with self._run_lock:
+                run = await asyncio.to_thread(self._start_run, prompt)
+                thread_id = run.thread_id
+                run = await self._wait_for_run(thread_id, run)
+                
+                latest = None
+                if run.status == "completed":
+                    # Only the newest message is needed, not the whole thread history
+                    messages = await asyncio.to_thread(
+                        agents.list_messages,
+                        thread_id=thread_id,
+                        limit=1,
+                        order="desc",
+                    )
+                    latest = messages.data[0] if messages.data else None
             
-            if run.status == "completed":
-                messages = self.project_client.agents.list_messages(thread_id=thread_id)
-                assistant_messages = [
-                    msg for msg in messages.data 
-                    if msg.role == MessageRole.ASSISTANT
-                ]
+            if latest is not None and latest.role == MessageRole.ASSISTANT:
+                # Get transformed content
+                transformed_content = latest.content[0].text.value
                 
-                if assistant_messages:
-                    # Get transformed content
-                    transformed_content = assistant_messages[0].content[0].text.value
-                    
-                    # Update pipeline data
-                    data.content = transformed_content
-                    data.add_transformation(self.name)
-                    data.metadata[f"{self.name}_status"] = "success"
-                    
-                    logger.info(f"Filter '{self.name}' completed successfully")
-                    return data
+                # Update pipeline data
+                data.content = transformed_content
+                data.add_transformation(self.name)
+                data.metadata[f"{self.name}_status"] = "success"
+                
+                logger.info("Filter '%s' completed successfully", self.name)
+                return data
             
             # Handle failures
             data.metadata[f"{self.name}_status"] = f"failed: {run.status}"
-            logger.warning(f"Filter '{self.name}' failed with status: {run.status}")
+            logger.warning("Filter '%s' failed with status: %s", self.name, run.status)
             return data
             
         except Exception as e:
-            logger.error(f"Error in filter '{self.name}': {e}", exc_info=True)
+            logger.error("Error in filter '%s': %s", self.name, e, exc_info=True)
             data.metadata[f"{self.name}_error"] = str(e)
             return data
 
@@ -144,9 +211,14 @@ class Pipeline:
     def add_filter(self, filter: CognitiveFilter) -> "Pipeline":
         """Add a filter to the pipeline."""
         self.filters.append(filter)
-        logger.info(f"Added filter '{filter.name}' to pipeline '{self.name}'")
+        logger.info("Added filter '%s' to pipeline '%s'", filter.name, self.name)
         return self
     
+    async def warmup(self) -> None:
+        """Create every filter's conversation thread concurrently before the first execute."""
+        await asyncio.gather(*(filter.warmup() for filter in self.filters))
+        logger.info("Pipeline '%s' warmed up %d filters", self.name, len(self.filters))
+    
     async def execute(self, data: PipelineData) -> PipelineData:
         """
         Execute the pipeline by passing data through all filters sequentially.
@@ -157,17 +229,17 @@ class Pipeline:
         Returns:
             Final transformed data
         """
-        logger.info(f"Starting pipeline '{self.name}' with {len(self.filters)} filters")
+        logger.info("Starting pipeline '%s' with %d filters", self.name, len(self.filters))
         
         for filter in self.filters:
             data = await filter.process(data)
             
             # Check if we should continue
             if data.metadata.get(f"{filter.name}_status") == "failed":
-                logger.warning(f"Pipeline '{self.name}' stopped at filter '{filter.name}'")
+                logger.warning("Pipeline '%s' stopped at filter '%s'", self.name, filter.name)
                 break
         
-        logger.info(f"Pipeline '{self.name}' completed")
+        logger.info("Pipeline '%s' completed", self.name)
         return data
 
 
@@ -185,24 +257,29 @@ class ParallelPipeline(Pipeline):
             List of transformed data from each filter
         """
         logger.info(
-            f"Starting parallel pipeline '{self.name}' with {len(self.filters)} filters"
+            "Starting parallel pipeline '%s' with %d filters", self.name, len(self.filters)
         )
         
-        # Create data copies for each filter
+        # Each filter gets its own copy: filters write into metadata and
+        # append to the transformations, and the results must be independent
         tasks = []
         for filter in self.filters:
-            # Create a copy of the data
-            data_copy = PipelineData(
-                content=data.content,
-                metadata=data.metadata.copy(),
-                transformations=data.transformations.copy(),
+            names, timestamps = data.copy_transformations()
+            tasks.append(
+                filter.process(
+                    PipelineData(
+                        content=data.content,
+                        metadata=dict(data.metadata),
+                        transformation_names=names,
+                        transformation_timestamps=timestamps,
+                    )
+                )
             )
-            tasks.append(filter.process(data_copy))
         
         # Execute all filters concurrently
         results = await asyncio.gather(*tasks)
         
-        logger.info(f"Parallel pipeline '{self.name}' completed")
+        logger.info("Parallel pipeline '%s' completed", self.name)
         return results
 
 
@@ -218,7 +295,7 @@ async def create_filter_agent(
         name=name,
         instructions=filter_instructions,
     )
-    logger.info(f"Created filter agent: {name} (ID: {agent.id})")
+    logger.info("Created filter agent: %s (ID: %s)", name, agent.id)
     return agent.id
 
 
@@ -280,6 +357,9 @@ async def demo_text_processing_pipeline() -> None:
     starting next month, with special pricing for startups and educational institutions.
     """
     
+    # Create all filter threads in parallel instead of lazily on first use
+    await pipeline.warmup()
+    
     data = PipelineData(content=input_text)
     
     # Execute pipeline
@@ -8,13 +8,12 @@ import asyncio
 import logging
 import uuid
 from typing import Any, Dict, List, Optional
-from datetime import datetime
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from pydantic import BaseModel, Field
 import uvicorn
 
-from shared.utils import get_project_client, load_env_config, EventHubAdapter
+from shared.utils import get_project_client, load_env_config, EventHubAdapter, iso_now
 from shared.mcp.fastapi_mcp import FastAPIMCP
 from main import (
     PubSubBroker,
@@ -114,13 +113,13 @@ async def shutdown_event() -> None:
 async def publish_message(request: PublishRequest) -> PublishResponse:
     """Publish a message to a topic."""
     try:
-        message_id = str(uuid.uuid4())
+        message_id = uuid.uuid4().hex
         
         message = Message(
             topic=request.topic,
             payload=request.payload,
             message_id=message_id,
-            timestamp=datetime.utcnow().isoformat(),
+            timestamp=iso_now(),
         )
         
         await broker.publish(message)
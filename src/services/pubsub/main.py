@@ -13,9 +13,7 @@ Key Features:
 
 import asyncio
 import logging
-import json
 from typing import Any, Dict, List, Callable, Optional
-from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
 
@@ -23,7 +21,8 @@ from azure.eventhub import EventData
 from azure.ai.projects import AIProjectClient
 from azure.ai.agents.models import MessageRole
 
-from shared.utils import get_project_client, load_env_config, EventHubAdapter
+from shared.serialization import dumps, loads
+from shared.utils import get_project_client, load_env_config, EventHubAdapter, event_body_bytes, iso_now
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -122,7 +121,7 @@ class AgentSubscriber:
             Timestamp: {message.timestamp}
             
             Payload:
-            {json.dumps(message.payload, indent=2)}
+            {dumps(message.payload).decode()}
             
             Please process this message according to your role and provide:
             1. Your analysis of the event
@@ -148,14 +147,16 @@ class AgentSubscriber:
             )
             
             if run.status == "completed":
-                messages = self.project_client.agents.list_messages(thread_id=thread_id)
-                assistant_messages = [
-                    msg for msg in messages.data 
-                    if msg.role == MessageRole.ASSISTANT
-                ]
+                # Only the newest message is needed, not the whole thread history
+                messages = self.project_client.agents.list_messages(
+                    thread_id=thread_id,
+                    limit=1,
+                    order="desc",
+                )
+                latest = messages.data[0] if messages.data else None
                 
-                if assistant_messages:
-                    response = assistant_messages[0].content[0].text.value
+                if latest is not None and latest.role == MessageRole.ASSISTANT:
+                    response = latest.content[0].text.value
                     self.processed_count += 1
                     
                     result = {
@@ -165,7 +166,7 @@ class AgentSubscriber:
                         "message_id": message.message_id,
                         "response": response,
                         "processed_count": self.processed_count,
-                        "timestamp": datetime.utcnow().isoformat(),
+                        "timestamp": iso_now(),
                     }
                     
                     logger.info(
@@ -221,7 +222,7 @@ class PubSubBroker:
         """Process an event from Event Hub."""
         try:
             # Parse message
-            message_data = json.loads(event.body_as_str())
+            message_data = loads(event_body_bytes(event))
             message = Message.from_dict(message_data)
             
             logger.info(f"Received message on topic: {message.topic.value}")
@@ -373,7 +374,7 @@ async def demo_pubsub_system() -> None:
                 "rating": 4,
             },
             message_id="msg_001",
-            timestamp=datetime.utcnow().isoformat(),
+            timestamp=iso_now(),
         ),
         Message(
             topic=TopicType.ORDER_EVENTS,
@@ -385,7 +386,7 @@ async def demo_pubsub_system() -> None:
                 "items": ["laptop_stand", "wireless_mouse"],
             },
             message_id="msg_002",
-            timestamp=datetime.utcnow().isoformat(),
+            timestamp=iso_now(),
         ),
     ]
     
@@ -1,15 +1,29 @@
 """Clientes Azure reutilizáveis para Service Bus e outros serviços."""
 
+import asyncio
 import os
-from typing import Optional
-from azure.servicebus import ServiceBusClient
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from azure.servicebus import ServiceBusClient, ServiceBusMessage
 from azure.servicebus.aio import ServiceBusClient as AsyncServiceBusClient
+from azure.servicebus.aio import ServiceBusSender as AsyncServiceBusSender
+from azure.servicebus.exceptions import MessageSizeExceededError
 from azure.identity import DefaultAzureCredential
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
+# Clientes assíncronos compartilhados por connection string; o SDK multiplexa
+# senders e receivers sobre a conexão AMQP de cada cliente
+_ASYNC_CLIENTS: Dict[str, AsyncServiceBusClient] = {}
+
+
+@lru_cache(maxsize=1)
+def get_connection_string() -> Optional[str]:
+    """Obtém a connection string do Service Bus das variáveis de ambiente (lida uma vez)."""
+    return os.getenv("AZURE_SERVICEBUS_CONNECTION_STRING")
+
 
 def get_service_bus_client(connection_string: Optional[str] = None) -> ServiceBusClient:
     """
@@ -21,7 +35,7 @@ def get_service_bus_client(connection_string: Optional[str] = None) -> ServiceBu
     Returns:
         ServiceBusClient configurado
     """
-    conn_str = connection_string or os.getenv("AZURE_SERVICEBUS_CONNECTION_STRING")
+    conn_str = connection_string or get_connection_string()
     if not conn_str:
         raise ValueError(
             "Connection string não encontrada. "
@@ -31,38 +45,211 @@ def get_service_bus_client(connection_string: Optional[str] = None) -> ServiceBu
 
 
 def get_async_service_bus_client(
-    connection_string: Optional[str] = None
+    connection_string: Optional[str] = None,
+    dedicated: bool = False
 ) -> AsyncServiceBusClient:
     """
     Obtém um cliente assíncrono do Azure Service Bus.
     
+    Por padrão o cliente é compartilhado no processo (um por connection string)
+    e não deve ser fechado pelo chamador; use ``aclose_all()`` no encerramento.
+    
     Args:
         connection_string: String de conexão. Se não fornecida, usa a variável de ambiente.
+        dedicated: Se True, cria um cliente (e conexão) exclusivo, que o
+            chamador é responsável por fechar
     
     Returns:
         AsyncServiceBusClient configurado
     """
-    conn_str = connection_string or os.getenv("AZURE_SERVICEBUS_CONNECTION_STRING")
+    conn_str = connection_string or get_connection_string()
     if not conn_str:
         raise ValueError(
             "Connection string não encontrada. "
             "Defina AZURE_SERVICEBUS_CONNECTION_STRING no .env"
         )
-    return AsyncServiceBusClient.from_connection_string(conn_str)
+    if dedicated:
+        return AsyncServiceBusClient.from_connection_string(conn_str)
+    
+    client = _ASYNC_CLIENTS.get(conn_str)
+    if client is None:
+        client = AsyncServiceBusClient.from_connection_string(conn_str)
+        _ASYNC_CLIENTS[conn_str] = client
+    return client
+
+
+async def aclose_all() -> None:
+    """Fecha todos os clientes assíncronos compartilhados."""
+    clients = list(_ASYNC_CLIENTS.values())
+    _ASYNC_CLIENTS.clear()
+    for client in clients:
+        await client.close()
+
+
+def message_body_bytes(msg: Any) -> bytes:
+    """
+    Obtém o corpo de uma mensagem recebida do Service Bus como bytes.
+    
+    O corpo é exposto como bytes ou como um iterável de chunks; no primeiro
+    caso o buffer original é devolvido sem cópia.
+    
+    Args:
+        msg: Mensagem recebida do Service Bus
+    
+    Returns:
+        Conteúdo do corpo da mensagem
+    """
+    body = msg.body
+    if isinstance(body, (bytes, bytearray)):
+        return body
+    return b"".join(body)
+
+
+async def send_batched(
+    sender: AsyncServiceBusSender,
+    messages: Iterable[ServiceBusMessage],
+    on_sent: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Envia mensagens agrupadas em ServiceBusMessageBatch.
+    
+    Cada lote é enviado em um único round-trip ao broker. Quando o lote atinge
+    o tamanho máximo permitido pelo namespace (256 KB no Standard, 1 MB no
+    Premium), ele é enviado e um novo lote é iniciado.
+    
+    Args:
+        sender: Sender assíncrono da fila ou tópico
+        messages: Mensagens a enviar
+        on_sent: Callback opcional chamado com a quantidade de mensagens de
+            cada lote após o envio bem-sucedido
+    
+    Returns:
+        Número de mensagens enviadas
+    
+    Raises:
+        MessageSizeExceededError: Se uma mensagem sozinha exceder o tamanho máximo do lote
+    """
+    batch = await sender.create_message_batch()
+    sent = 0
+    
+    for message in messages:
+        try:
+            batch.add_message(message)
+        except MessageSizeExceededError:
+            if len(batch) == 0:
+                raise
+            await sender.send_messages(batch)
+            sent += len(batch)
+            if on_sent is not None:
+                on_sent(len(batch))
+            batch = await sender.create_message_batch()
+            batch.add_message(message)
+    
+    if len(batch):
+        await sender.send_messages(batch)
+        sent += len(batch)
+        if on_sent is not None:
+            on_sent(len(batch))
+    
+    return sent
+
+
+class ServiceBusBatchSender:
+    """
+    Agrupa envios concorrentes em lotes do Service Bus.
+    
+    Cada chamada a ``send`` enfileira a mensagem e aguarda a confirmação do
+    broker. Um worker em background drena a fila e envia tudo o que acumulou
+    em um único lote, de modo que N publicações concorrentes custam um
+    round-trip em vez de N, sem perder a confirmação por mensagem.
+    """
+    
+    def __init__(self, sender: AsyncServiceBusSender, max_batch_size: int = 100):
+        """
+        Args:
+            sender: Sender assíncrono da fila ou tópico
+            max_batch_size: Número máximo de mensagens drenadas por envio
+        """
+        self._sender = sender
+        self._max_batch_size = max_batch_size
+        self._queue: asyncio.Queue[Tuple[ServiceBusMessage, asyncio.Future]] = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+    
+    async def send(self, message: ServiceBusMessage) -> None:
+        """
+        Enfileira uma mensagem e aguarda a confirmação do seu lote.
+        
+        Args:
+            message: Mensagem a enviar
+        """
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((message, future))
+        await future
+    
+    async def close(self) -> None:
+        """Aguarda os envios pendentes e encerra o worker."""
+        if self._worker is None:
+            return
+        
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+    
+    async def _run(self) -> None:
+        """Drena a fila e envia as mensagens acumuladas em lote."""
+        while True:
+            pending: List[Tuple[ServiceBusMessage, asyncio.Future]] = [await self._queue.get()]
+            while len(pending) < self._max_batch_size and not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            
+            resolved = 0
+            
+            def resolve(count: int) -> None:
+                # Lotes já aceitos pelo broker são confirmados antes de um
+                # eventual erro em um lote seguinte
+                nonlocal resolved
+                for _, future in pending[resolved:resolved + count]:
+                    if not future.done():
+                        future.set_result(None)
+                resolved += count
+            
+            try:
+                await send_batched(
+                    self._sender,
+                    [message for message, _ in pending],
+                    on_sent=resolve
+                )
+            except Exception as e:
+                for _, future in pending[resolved:]:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in pending:
+                    self._queue.task_done()
 
 
+@lru_cache(maxsize=1)
 def get_queue_name() -> str:
     """Obtém o nome da fila do Service Bus das variáveis de ambiente."""
     queue_name = os.getenv("AZURE_SERVICEBUS_QUEUE_NAME", "agent-queue")
     return queue_name
 
 
+@lru_cache(maxsize=1)
 def get_topic_name() -> str:
     """Obtém o nome do tópico do Service Bus das variáveis de ambiente."""
     topic_name = os.getenv("AZURE_SERVICEBUS_TOPIC_NAME", "agent-topic")
     return topic_name
 
 
+@lru_cache(maxsize=1)
 def get_subscription_name() -> str:
     """Obtém o nome da assinatura do Service Bus das variáveis de ambiente."""
     subscription_name = os.getenv("AZURE_SERVICEBUS_SUBSCRIPTION_NAME", "agent-subscription")
@@ -79,7 +266,7 @@ class AzureServiceBusConfig:
         topic_name: Optional[str] = None,
         subscription_name: Optional[str] = None
     ):
-        self.connection_string = connection_string or os.getenv("AZURE_SERVICEBUS_CONNECTION_STRING")
+        self.connection_string = connection_string or get_connection_string()
         self.queue_name = queue_name or get_queue_name()
         self.topic_name = topic_name or get_topic_name()
         self.subscription_name = subscription_name or get_subscription_name()
@@ -5,27 +5,25 @@ This module provides a standardized interface for communication between
 Azure AI Foundry agents and enterprise integration services.
 """
 
-from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Protocol, runtime_checkable
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
 class MCPMessage:
     """Standard message format for MCP communication."""
     
-    def __init__(
-        self,
-        message_id: str,
-        message_type: str,
-        payload: Dict[str, Any],
-        metadata: Optional[Dict[str, Any]] = None,
-    ):
-        self.message_id = message_id
-        self.message_type = message_type
-        self.payload = payload
-        self.metadata = metadata or {}
+    message_id: str
+    message_type: str
+    payload: Dict[str, Any]
+    metadata: Optional[Dict[str, Any]] = field(default_factory=dict)
+    
+    def __post_init__(self) -> None:
+        if self.metadata is None:
+            self.metadata = {}
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert message to dictionary."""
@@ -47,28 +45,25 @@ class MCPMessage:
         )
 
 
-class MCPAdapter(ABC):
-    """Abstract base class for MCP adapters."""
+@runtime_checkable
+class MCPAdapter(Protocol):
+    """Interface for MCP adapters."""
     
-    @abstractmethod
     async def send_message(self, message: MCPMessage) -> None:
         """Send a message through the MCP layer."""
-        pass
+        ...
     
-    @abstractmethod
     async def receive_message(self) -> Optional[MCPMessage]:
         """Receive a message from the MCP layer."""
-        pass
+        ...
     
-    @abstractmethod
     async def connect(self) -> None:
         """Establish connection to the message broker."""
-        pass
+        ...
     
-    @abstractmethod
     async def disconnect(self) -> None:
         """Close connection to the message broker."""
-        pass
+        ...
 
 
 class MCPRouter:
@@ -76,6 +71,7 @@ class MCPRouter:
     
     def __init__(self) -> None:
         self.handlers: Dict[str, Any] = {}
+        self._missing = self._log_missing
     
     def register_handler(self, message_type: str, handler: Any) -> None:
         """Register a handler for a specific message type."""
@@ -84,10 +80,11 @@ class MCPRouter:
     
     async def route_message(self, message: MCPMessage) -> Any:
         """Route message to the appropriate handler."""
-        handler = self.handlers.get(message.message_type)
-        if handler is None:
-            logger.warning(f"No handler found for message type: {message.message_type}")
-            return None
-        
+        handler = self.handlers.get(message.message_type, self._missing)
         logger.info(f"Routing message {message.message_id} to handler for {message.message_type}")
         return await handler(message)
+    
+    async def _log_missing(self, message: MCPMessage) -> None:
+        """Fallback handler for message types without a registered handler."""
+        logger.warning(f"No handler found for message type: {message.message_type}")
+        return None
@@ -5,15 +5,26 @@ Provides REST API endpoints for MCP message handling using FastAPI.
 """
 
 from fastapi import FastAPI, HTTPException, status
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel, Field
 from typing import Any, Dict, Optional
 import logging
 import uuid
 
+try:
+    import orjson
+except ImportError:  # optional "perf" extra
+    orjson = None
+
 from shared.mcp import MCPMessage, MCPRouter
 
 logger = logging.getLogger(__name__)
 
+# ORJSONResponse needs orjson at render time; fall back to the stdlib encoder
+DefaultResponse = ORJSONResponse if orjson is not None else JSONResponse
+
+HEALTHY = {"status": "healthy"}
+
 
 class MessageRequest(BaseModel):
     """Request model for sending messages."""
@@ -33,7 +44,11 @@ class FastAPIMCP:
     """FastAPI application for MCP message handling."""
     
     def __init__(self, title: str = "MCP API", description: str = "Model Context Protocol API"):
-        self.app = FastAPI(title=title, description=description)
+        self.app = FastAPI(
+            title=title,
+            description=description,
+            default_response_class=DefaultResponse,
+        )
         self.router = MCPRouter()
         self._setup_routes()
     
@@ -41,9 +56,9 @@ class FastAPIMCP:
         """Setup FastAPI routes for MCP operations."""
         
         @self.app.post("/messages", response_model=MessageResponse)
-        async def send_message(request: MessageRequest) -> MessageResponse:
+        async def send_message(request: MessageRequest) -> DefaultResponse:
             """Send a message through MCP."""
-            message_id = str(uuid.uuid4())
+            message_id = uuid.uuid4().hex
             message = MCPMessage(
                 message_id=message_id,
                 message_type=request.message_type,
@@ -53,10 +68,10 @@ class FastAPIMCP:
             
             try:
                 result = await self.router.route_message(message)
-                return MessageResponse(
-                    message_id=message_id,
-                    status="success",
-                    result=result,
+                # Returning the response directly skips response_model validation
+                # and jsonable_encoder; handlers must return JSON-native results
+                return DefaultResponse(
+                    {"message_id": message_id, "status": "success", "result": result}
                 )
             except Exception as e:
                 logger.error(f"Error processing message: {e}")
@@ -66,9 +81,9 @@ class FastAPIMCP:
                 )
         
         @self.app.get("/health")
-        async def health_check() -> Dict[str, str]:
+        async def health_check() -> DefaultResponse:
             """Health check endpoint."""
-            return {"status": "healthy"}
+            return DefaultResponse(HEALTHY)
     
     def register_handler(self, message_type: str, handler: Any) -> None:
         """Register a message handler."""
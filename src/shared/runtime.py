@@ -0,0 +1,109 @@
+"""Utilitários de runtime para o event loop asyncio."""
+
+import asyncio
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Any, Coroutine, Optional, TypeVar
+
+try:
+    import uvloop
+except ImportError:  # uvloop é opcional (não disponível no Windows)
+    uvloop = None
+
+T = TypeVar("T")
+
+
+def eager_task_factory(
+    loop: asyncio.AbstractEventLoop,
+    coro: Coroutine[Any, Any, Any],
+    **kwargs: Any
+) -> asyncio.Task:
+    """
+    Fábrica de tasks que executa a coroutine imediatamente até a primeira suspensão.
+
+    Equivalente a ``asyncio.eager_task_factory``, mas força ``eager_start=True``
+    mesmo quando o loop (ex.: uvloop) repassa o argumento explicitamente.
+    """
+    kwargs["eager_start"] = True
+    return asyncio.Task(coro, loop=loop, **kwargs)
+
+
+def enable_eager_tasks(loop: Optional[asyncio.AbstractEventLoop] = None) -> bool:
+    """
+    Habilita a execução eager de tasks no loop informado (ou no loop atual).
+
+    Coroutines que terminam sem suspender deixam de passar pelo scheduler.
+    Disponível a partir do Python 3.12; em versões anteriores não faz nada.
+
+    Args:
+        loop: Event loop a configurar. Se não fornecido, usa o loop em execução.
+
+    Returns:
+        True se a fábrica eager foi instalada
+    """
+    if sys.version_info < (3, 12):
+        return False
+
+    loop = loop or asyncio.get_running_loop()
+    loop.set_task_factory(eager_task_factory)
+    return True
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Cria um event loop uvloop (quando instalado) com tasks eager habilitadas.
+
+    Returns:
+        Novo event loop, ainda não em execução
+    """
+    loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+    enable_eager_tasks(loop)
+    return loop
+
+
+def run(main: Coroutine[Any, Any, T]) -> T:
+    """
+    Executa a coroutine principal em um loop criado por ``new_event_loop``.
+
+    Ponto de entrada comum dos exemplos, no lugar de ``asyncio.run``.
+
+    Args:
+        main: Coroutine a executar
+
+    Returns:
+        Resultado da coroutine
+    """
+    with asyncio.Runner(loop_factory=new_event_loop) as runner:
+        return runner.run(main)
+
+
+def start_queue_logging(
+    logger: Optional[logging.Logger] = None
+) -> logging.handlers.QueueListener:
+    """
+    Move os handlers do logger para uma thread dedicada via QueueHandler.
+
+    As coroutines passam a apenas enfileirar o LogRecord; formatação e escrita
+    em stdout/stderr acontecem na thread do QueueListener, sem bloquear o loop.
+
+    Args:
+        logger: Logger a configurar. Se não fornecido, usa o logger raiz.
+
+    Returns:
+        QueueListener já iniciado (chame ``stop()`` ao encerrar para drenar a fila)
+    """
+    logger = logger or logging.getLogger()
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    handlers = list(logger.handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    return listener
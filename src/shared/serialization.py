@@ -0,0 +1,64 @@
+"""Serialização JSON rápida, usando orjson quando disponível."""
+
+import json
+from typing import Any
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional (extra "perf"); usa a biblioteca padrão
+    orjson = None
+
+
+if orjson is not None:
+    # orjson.JSONDecodeError é subclasse de json.JSONDecodeError
+    JSONDecodeError = orjson.JSONDecodeError
+    loads = orjson.loads
+
+    def dumps(obj: Any) -> bytes:
+        """
+        Serializa um objeto para JSON compacto em bytes UTF-8.
+
+        Arrays numpy também são aceitos diretamente, sem ``tolist()``.
+
+        Args:
+            obj: Objeto serializável (dict, list, str, números...)
+
+        Returns:
+            JSON codificado em UTF-8
+        """
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+else:
+    JSONDecodeError = json.JSONDecodeError
+    loads = json.loads
+
+    def dumps(obj: Any) -> bytes:
+        """
+        Serializa um objeto para JSON compacto em bytes UTF-8.
+
+        Args:
+            obj: Objeto serializável (dict, list, str, números...)
+
+        Returns:
+            JSON codificado em UTF-8
+        """
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def model_to_json(model: BaseModel) -> bytes:
+    """
+    Serializa um modelo Pydantic direto para bytes JSON.
+
+    Usa o serializador compilado do pydantic-core, que já produz bytes:
+    evita o ``decode()`` feito por ``model_dump_json`` e a recodificação
+    posterior pelo transporte.
+
+    Args:
+        model: Modelo a serializar
+
+    Returns:
+        JSON codificado em UTF-8
+    """
+    return model.__pydantic_serializer__.to_json(model)
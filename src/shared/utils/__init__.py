@@ -8,11 +8,15 @@ from shared.utils.agent_utils import (
     create_agent,
 )
 
-from shared.utils.eventhub_utils import EventHubAdapter
+from shared.utils.eventhub_utils import EventHubAdapter, event_body_bytes
+from shared.utils.time_utils import iso_from_ns, iso_now
 
 __all__ = [
     "get_project_client",
     "load_env_config",
     "create_agent",
     "EventHubAdapter",
+    "event_body_bytes",
+    "iso_now",
+    "iso_from_ns",
 ]
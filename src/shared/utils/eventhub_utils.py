@@ -3,22 +3,108 @@ Utility functions for Azure Event Hub integration.
 """
 
 import asyncio
-from typing import Any, Callable, Optional
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 from azure.eventhub import EventData
 from azure.eventhub.aio import EventHubConsumerClient, EventHubProducerClient
 from azure.identity.aio import DefaultAzureCredential
 import logging
-import json
+
+from shared.serialization import dumps
 
 logger = logging.getLogger(__name__)
 
 
+class _SharedProducer:
+    """Producer client shared by every adapter targeting the same Event Hub."""
+    
+    __slots__ = ("client", "credential", "refs")
+    
+    def __init__(
+        self,
+        client: EventHubProducerClient,
+        credential: Optional[DefaultAzureCredential] = None,
+    ):
+        self.client = client
+        self.credential = credential
+        self.refs = 0
+
+
+# Keyed by (namespace or connection string, eventhub name)
+_PRODUCERS: Dict[Tuple[str, str], _SharedProducer] = {}
+
+
+def event_body_bytes(event: EventData) -> bytes:
+    """
+    Get the body of a received event as bytes.
+    
+    Unlike body_as_str(), no UTF-8 decode is done, so the body can go
+    straight to a JSON parser that accepts bytes.
+    """
+    body = event.body
+    if isinstance(body, (bytes, bytearray)):
+        return body
+    return b"".join(body)
+
+
+async def send_batched(
+    producer: EventHubProducerClient,
+    events: Iterable[EventData],
+    on_sent: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Send events packed into as few EventDataBatch objects as possible.
+    
+    A batch is sent when the next event no longer fits the broker's maximum
+    batch size, then a new batch is started. ``on_sent``, if given, is
+    called with the size of each batch once it has been sent.
+    
+    Returns:
+        Number of events sent
+    
+    Raises:
+        ValueError: If a single event exceeds the maximum batch size
+    """
+    batch = await producer.create_batch()
+    sent = 0
+    
+    for event in events:
+        try:
+            batch.add(event)
+        except ValueError:
+            if len(batch) == 0:
+                raise
+            await producer.send_batch(batch)
+            sent += len(batch)
+            if on_sent is not None:
+                on_sent(len(batch))
+            batch = await producer.create_batch()
+            batch.add(event)
+    
+    if len(batch):
+        await producer.send_batch(batch)
+        sent += len(batch)
+        if on_sent is not None:
+            on_sent(len(batch))
+    
+    return sent
+
+
 class EventHubAdapter:
     """Adapter for Azure Event Hub integration.
     
     Supports two authentication modes:
     - Entra ID (recommended): provide fully_qualified_namespace + eventhub_name
     - Connection string (legacy): provide connection_string + eventhub_name
+    
+    Events passed to send_event are sent in batches by a background task;
+    ``linger`` is how many seconds it waits for more events before sending
+    (0 only batches events that are already queued), cut short once
+    ``max_batch_events`` events are waiting.
+    
+    receive_events checkpoints each partition after ``checkpoint_every`` events
+    or ``checkpoint_interval`` seconds, whichever comes first, instead of once
+    per event. Events after the last checkpoint may be redelivered on restart.
     """
     
     def __init__(
@@ -27,14 +113,25 @@ class EventHubAdapter:
         fully_qualified_namespace: Optional[str] = None,
         connection_string: Optional[str] = None,
         consumer_group: str = "$Default",
+        linger: float = 0.0,
+        max_batch_events: int = 500,
+        checkpoint_every: int = 100,
+        checkpoint_interval: float = 5.0,
     ):
         self.eventhub_name = eventhub_name
         self.fully_qualified_namespace = fully_qualified_namespace
         self.connection_string = connection_string
         self.consumer_group = consumer_group
         self.producer: Optional[EventHubProducerClient] = None
+        self._producer_key: Optional[Tuple[str, str]] = None
         self.consumer: Optional[EventHubConsumerClient] = None
         self._credential: Optional[DefaultAzureCredential] = None
+        self._linger = linger
+        self._max_batch_events = max(1, max_batch_events)
+        self._checkpoint_every = checkpoint_every
+        self._checkpoint_interval = checkpoint_interval
+        self._pending: asyncio.Queue[Tuple[EventData, asyncio.Future]] = asyncio.Queue()
+        self._flush_task: Optional[asyncio.Task] = None
         
         if not fully_qualified_namespace and not connection_string:
             raise ValueError(
@@ -51,21 +148,57 @@ class EventHubAdapter:
         return self._credential
     
     async def get_producer(self) -> EventHubProducerClient:
-        """Get or create producer client."""
+        """
+        Get the producer client for this Event Hub.
+        
+        Adapters pointing at the same Event Hub share one producer (and one
+        AMQP connection). The client is reference-counted: do not close it
+        directly, call close() on the adapter instead.
+        """
         if self.producer is None:
-            if self._use_identity:
-                self.producer = EventHubProducerClient(
-                    fully_qualified_namespace=self.fully_qualified_namespace,
-                    eventhub_name=self.eventhub_name,
-                    credential=self._get_credential(),
-                )
-            else:
-                self.producer = EventHubProducerClient.from_connection_string(
-                    self.connection_string,
-                    eventhub_name=self.eventhub_name,
-                )
+            key = (self.fully_qualified_namespace or self.connection_string, self.eventhub_name)
+            shared = _PRODUCERS.get(key)
+            if shared is None:
+                shared = _PRODUCERS[key] = self._create_producer()
+            shared.refs += 1
+            self._producer_key = key
+            self.producer = shared.client
         return self.producer
     
+    def _create_producer(self) -> _SharedProducer:
+        """Build a new producer client, owning its credential in identity mode."""
+        if self._use_identity:
+            credential = DefaultAzureCredential()
+            client = EventHubProducerClient(
+                fully_qualified_namespace=self.fully_qualified_namespace,
+                eventhub_name=self.eventhub_name,
+                credential=credential,
+            )
+            return _SharedProducer(client, credential)
+        
+        client = EventHubProducerClient.from_connection_string(
+            self.connection_string,
+            eventhub_name=self.eventhub_name,
+        )
+        return _SharedProducer(client)
+    
+    async def _release_producer(self) -> None:
+        """Drop this adapter's reference to the shared producer."""
+        key = self._producer_key
+        self.producer = None
+        self._producer_key = None
+        
+        shared = _PRODUCERS.get(key)
+        if shared is None:
+            return
+        
+        shared.refs -= 1
+        if shared.refs <= 0:
+            del _PRODUCERS[key]
+            await shared.client.close()
+            if shared.credential:
+                await shared.credential.close()
+    
     async def get_consumer(self) -> EventHubConsumerClient:
         """Get or create consumer client."""
         if self.consumer is None:
@@ -84,52 +217,243 @@ class EventHubAdapter:
                 )
         return self.consumer
     
-    async def send_event(self, data: Any) -> None:
-        """Send an event to Event Hub."""
-        producer = await self.get_producer()
+    @staticmethod
+    def _to_event_data(data: Any, content_type: Optional[str] = None) -> EventData:
+        """
+        Wrap data in EventData.
         
-        # Convert data to JSON string
-        if not isinstance(data, str):
-            data = json.dumps(data)
+        str and binary payloads (bytes, bytearray, memoryview) are sent as-is,
+        so pre-serialized frames skip JSON entirely; anything else is
+        JSON-encoded.
+        """
+        if isinstance(data, (bytearray, memoryview)):
+            data = bytes(data)
+        elif not isinstance(data, (str, bytes)):
+            data = dumps(data)
         
         event_data = EventData(data)
-        event_data_batch = await producer.create_batch()
-        event_data_batch.add(event_data)
-        await producer.send_batch(event_data_batch)
-        logger.info(f"Sent event to Event Hub: {self.eventhub_name}")
+        if content_type is not None:
+            event_data.content_type = content_type
+        return event_data
+    
+    async def send_event(self, data: Any, content_type: Optional[str] = None) -> None:
+        """
+        Send an event to Event Hub.
+        
+        Concurrent calls are coalesced by a background task into shared
+        EventDataBatch sends; each call still waits for its batch to be
+        acknowledged.
+        
+        Args:
+            data: Event payload; str/bytes are sent unchanged, other values as JSON
+            content_type: Optional content type set on the EventData
+        """
+        event_data = self._to_event_data(data, content_type)
+        
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._run_sender())
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending.put_nowait((event_data, future))
+        await future
+        logger.info("Sent event to Event Hub: %s", self.eventhub_name)
+    
+    async def send_events(
+        self,
+        items: Iterable[Any],
+        content_type: Optional[str] = None,
+    ) -> int:
+        """
+        Send several events, filling each EventDataBatch up to its size limit.
+        
+        Returns:
+            Number of events sent
+        """
+        producer = await self.get_producer()
+        sent = await send_batched(
+            producer,
+            (self._to_event_data(item, content_type) for item in items),
+        )
+        logger.info("Sent %d events to Event Hub: %s", sent, self.eventhub_name)
+        return sent
+    
+    async def flush(self) -> None:
+        """Wait until every event queued by send_event has been sent."""
+        await self._pending.join()
+    
+    async def _run_sender(self) -> None:
+        """Drain queued events and send them in batches."""
+        while True:
+            pending: List[Tuple[EventData, asyncio.Future]] = [await self._pending.get()]
+            if self._linger:
+                # Wait up to ``linger`` for more events, or until the batch is full
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + self._linger
+                while len(pending) < self._max_batch_events:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        pending.append(await asyncio.wait_for(self._pending.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            while not self._pending.empty():
+                pending.append(self._pending.get_nowait())
+            
+            resolved = 0
+            
+            def resolve(count: int) -> None:
+                # Complete batches already accepted by the broker, so a failure
+                # in a later batch only reaches the events that were not sent
+                nonlocal resolved
+                for _, future in pending[resolved:resolved + count]:
+                    if not future.done():
+                        future.set_result(None)
+                resolved += count
+            
+            try:
+                producer = await self.get_producer()
+                await send_batched(
+                    producer, [event for event, _ in pending], on_sent=resolve
+                )
+            except Exception as e:
+                for _, future in pending[resolved:]:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in pending:
+                    self._pending.task_done()
     
     async def receive_events(
         self,
         on_event: Callable[[EventData], Any],
         starting_position: str = "-1",  # -1 means from the beginning
+        max_batch_size: int = 300,
+        prefetch: int = 300,
     ) -> None:
         """
         Receive events from Event Hub.
         
+        Events of each received batch are dispatched to the callback
+        concurrently; a failing event is logged and skipped.
+        
         Args:
             on_event: Callback function to process each event
             starting_position: Starting position for reading events
+            max_batch_size: Maximum number of events delivered per batch
+            prefetch: Number of events buffered ahead per partition
+        """
+        async def on_event_batch(events: List[EventData]) -> None:
+            results = await asyncio.gather(
+                *(on_event(event) for event in events),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Error processing event: %s", result)
+        
+        await self.receive_event_batches(
+            on_event_batch,
+            starting_position=starting_position,
+            max_batch_size=max_batch_size,
+            prefetch=prefetch,
+        )
+    
+    async def receive_event_batches(
+        self,
+        on_event_batch: Callable[[List[EventData]], Awaitable[Any]],
+        starting_position: str = "-1",  # -1 means from the beginning
+        max_batch_size: int = 300,
+        prefetch: int = 300,
+    ) -> None:
+        """
+        Receive events from Event Hub, handing each batch to the callback.
+        
+        Args:
+            on_event_batch: Callback that processes a list of events
+            starting_position: Starting position for reading events
+            max_batch_size: Maximum number of events delivered per batch
+            prefetch: Number of events buffered ahead per partition,
+                bounding the consumer's memory use
         """
         consumer = await self.get_consumer()
+        # Per-partition progress since the last checkpoint
+        uncheckpointed: Dict[str, int] = {}
+        last_checkpoint: Dict[str, float] = {}
         
-        async def on_event_batch(partition_context: Any, events: list) -> None:
-            for event in events:
+        async def handle_batch(partition_context: Any, events: List[EventData]) -> None:
+            try:
+                await on_event_batch(events)
+            except Exception as e:
+                logger.error("Error processing event batch: %s", e)
+                return
+            
+            partition_id = partition_context.partition_id
+            count = uncheckpointed.get(partition_id, 0) + len(events)
+            now = time.monotonic()
+            if (
+                count >= self._checkpoint_every
+                or now - last_checkpoint.get(partition_id, 0.0) >= self._checkpoint_interval
+            ):
+                await partition_context.update_checkpoint(events[-1])
+                count = 0
+                last_checkpoint[partition_id] = now
+            uncheckpointed[partition_id] = count
+        
+        # Polling and dispatch run in separate coroutines: the SDK callback only
+        # enqueues, so slow user callbacks don't stall AMQP receives. One
+        # dispatcher per partition keeps per-partition ordering.
+        dispatchers: Dict[str, Tuple[asyncio.Queue, asyncio.Task]] = {}
+        queue_size = max(1, prefetch // max_batch_size)
+        
+        async def dispatch(queue: asyncio.Queue) -> None:
+            while True:
+                partition_context, events = await queue.get()
                 try:
-                    await on_event(event)
-                    await partition_context.update_checkpoint(event)
+                    await handle_batch(partition_context, events)
                 except Exception as e:
-                    logger.error(f"Error processing event: {e}")
+                    logger.error("Error checkpointing event batch: %s", e)
+                finally:
+                    queue.task_done()
         
-        async with consumer:
-            await consumer.receive(
-                on_event_batch=on_event_batch,
-                starting_position=starting_position,
-            )
+        async def enqueue_batch(partition_context: Any, events: List[EventData]) -> None:
+            if not events:
+                return
+            
+            partition_id = partition_context.partition_id
+            entry = dispatchers.get(partition_id)
+            if entry is None:
+                queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+                entry = dispatchers[partition_id] = (queue, asyncio.create_task(dispatch(queue)))
+            # Blocks when the dispatcher falls behind, bounding buffered events
+            await entry[0].put((partition_context, events))
+        
+        try:
+            async with consumer:
+                await consumer.receive_batch(
+                    on_event_batch=enqueue_batch,
+                    starting_position=starting_position,
+                    max_batch_size=max_batch_size,
+                    prefetch=prefetch,
+                )
+        finally:
+            tasks = [task for _, task in dispatchers.values()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
     
     async def close(self) -> None:
         """Close producer and consumer clients."""
+        if self._flush_task is not None:
+            await self.flush()
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
         if self.producer:
-            await self.producer.close()
+            await self._release_producer()
         if self.consumer:
             await self.consumer.close()
         if self._credential:
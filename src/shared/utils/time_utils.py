@@ -0,0 +1,32 @@
+"""
+Utility functions for timestamps.
+"""
+
+import time
+
+# (epoch second, "YYYY-MM-DDTHH:MM:SS") of the last formatted second
+_second_cache = (-1, "")
+
+
+def iso_now() -> str:
+    """
+    Return the current UTC time as an ISO 8601 string with microseconds.
+    
+    Same format as datetime.utcnow().isoformat(), but the date/time part is
+    formatted only once per second; other calls just append the microseconds.
+    """
+    return iso_from_ns(time.time_ns())
+
+
+def iso_from_ns(timestamp_ns: int) -> str:
+    """
+    Format UTC epoch nanoseconds in the same format as iso_now().
+    """
+    global _second_cache
+    
+    seconds, micros = divmod(timestamp_ns // 1000, 1_000_000)
+    cached_second, prefix = _second_cache
+    if seconds != cached_second:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+        _second_cache = (seconds, prefix)
+    return f"{prefix}.{micros:06d}"
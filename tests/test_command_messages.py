@@ -45,6 +45,27 @@ async def test_command_handler_executes_command():
     assert response.result["input"]["key"] == "value"
 
 
+@pytest.mark.asyncio
+async def test_command_handler_executes_sync_command():
+    """Test that plain (non-async) command functions are supported."""
+    config = AgentConfig(name="TestHandler")
+    handler = CommandHandler(
+        config,
+        command_handlers={"sync_command": lambda params: {"doubled": params["n"] * 2}}
+    )
+    
+    command = CommandMessage(
+        id="test-id",
+        source="test",
+        command_name="sync_command",
+        parameters={"n": 21}
+    )
+    
+    response = await handler.execute_command(command)
+    assert response.status == "success"
+    assert response.result["doubled"] == 42
+
+
 @pytest.mark.asyncio
 async def test_command_handler_returns_error_for_unknown_command():
     """Test that handler returns error for unknown command."""
@@ -123,6 +144,31 @@ async def test_command_invoker_timeout():
         )
 
 
+@pytest.mark.asyncio
+async def test_command_invoker_async_tracks_background_tasks():
+    """Test that fire-and-forget commands are tracked until they finish."""
+    calls = []
+    
+    async def recording_handler(params: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(0)
+        calls.append(params)
+        return {}
+    
+    config = AgentConfig(name="TestHandler")
+    handler = CommandHandler(
+        config,
+        command_handlers={"record": recording_handler}
+    )
+    
+    invoker = CommandInvoker("TestInvoker")
+    command_id = await invoker.invoke_async(handler, "record", {"n": 1})
+    
+    assert command_id
+    await invoker.wait_pending()
+    assert calls == [{"n": 1}]
+    assert not invoker._background_tasks
+
+
 @pytest.mark.asyncio
 async def test_command_bus():
     """Test command bus routing."""
@@ -179,3 +225,22 @@ async def test_command_bus_list_commands():
     assert "cmd1" in commands
     assert "cmd2" in commands
     assert len(commands) == 2
+
+
+def test_command_bus_command_names():
+    """Test cached command name set and membership."""
+    config = AgentConfig(name="Handler")
+    handler = CommandHandler(
+        config,
+        command_handlers={"cmd1": sample_command_handler}
+    )
+    
+    bus = CommandBus()
+    assert bus.command_names == frozenset()
+    
+    bus.register_handler("cmd1", handler)
+    bus.register_handler("cmd2", handler)
+    
+    assert bus.command_names == frozenset({"cmd1", "cmd2"})
+    assert "cmd1" in bus
+    assert "unknown" not in bus
@@ -1,5 +1,6 @@
 """Tests for Pipes and Filters pattern."""
 
+import asyncio
 import pytest
 import uuid
 from datetime import datetime
@@ -199,3 +200,179 @@ async def test_custom_filter():
     result = await filter.process_message(message)
     assert result is not None
     assert result.payload["name"] == "TEST"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_does_not_mutate_input_payload():
+    """Test that in-place filters inside a pipeline keep the original payload intact."""
+    
+    class InPlaceFilter(FilterAgent):
+        async def filter(self, message: AgentMessage):
+            message.payload["touched"] = True
+            return message
+    
+    pipeline = Pipeline([InPlaceFilter(AgentConfig(name="InPlaceFilter"))])
+    
+    message = AgentMessage(
+        id=str(uuid.uuid4()),
+        type=MessageType.EVENT,
+        source="test",
+        payload={"name": "Test"}
+    )
+    
+    result = await pipeline.process(message)
+    assert result is not None
+    assert result.payload["touched"] is True
+    assert "touched" not in message.payload
+
+
+@pytest.mark.asyncio
+async def test_process_batch_bounds_concurrency():
+    """Test that process_batch respects max_concurrency and keeps input order."""
+    
+    class SlowFilter(FilterAgent):
+        active = 0
+        peak = 0
+        
+        async def filter(self, message: AgentMessage):
+            SlowFilter.active += 1
+            SlowFilter.peak = max(SlowFilter.peak, SlowFilter.active)
+            await asyncio.sleep(0)
+            SlowFilter.active -= 1
+            if message.payload["index"] == 3:
+                return None
+            return message
+    
+    pipeline = Pipeline(
+        [SlowFilter(AgentConfig(name="SlowFilter"), pass_through=False)],
+        max_concurrency=2
+    )
+    
+    messages = [
+        AgentMessage(
+            id=str(uuid.uuid4()),
+            type=MessageType.EVENT,
+            source="test",
+            payload={"index": i}
+        )
+        for i in range(6)
+    ]
+    
+    results = await pipeline.process_batch(messages)
+    assert [r.payload["index"] for r in results] == [0, 1, 2, 4, 5]
+    assert SlowFilter.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_process_stream_yields_passing_messages():
+    """Test that process_stream consumes a generator and skips filtered messages."""
+    validation_filter = ValidationFilter(
+        AgentConfig(name="ValidationFilter"),
+        required_fields=["name"]
+    )
+    pipeline = Pipeline([validation_filter], max_concurrency=3)
+    
+    messages = (
+        AgentMessage(
+            id=str(uuid.uuid4()),
+            type=MessageType.EVENT,
+            source="test",
+            payload={"name": f"User {i}"} if i % 2 == 0 else {}
+        )
+        for i in range(10)
+    )
+    
+    results = [result async for result in pipeline.process_stream(messages)]
+    assert sorted(r.payload["name"] for r in results) == [f"User {i}" for i in range(0, 10, 2)]
+
+
+@pytest.mark.asyncio
+async def test_specialized_and_generic_pipelines_agree(monkeypatch):
+    """Test that the generated pipeline matches the generic loop fallback."""
+    import patterns.pipes_and_filters as pf
+    
+    def build():
+        return Pipeline([
+            EnrichmentFilter(AgentConfig(name="Enrich"), enrichment_data={"seen": True}),
+            ValidationFilter(AgentConfig(name="Validate"), required_fields=["name"]),
+            TransformFilter(AgentConfig(name="Upper"), transform_func=lambda p: {**p, "name": p["name"].upper()}),
+        ])
+    
+    messages = [
+        AgentMessage(id="ok", type=MessageType.EVENT, source="test", payload={"name": "ana"}),
+        AgentMessage(id="bad", type=MessageType.EVENT, source="test", payload={}),
+    ]
+    
+    specialized = [await build().process(m) for m in messages]
+    monkeypatch.setattr(pf, "MAX_SPECIALIZED_FILTERS", 0)
+    generic = [await build().process(m) for m in messages]
+    batched = await build().process_batch(messages)
+    
+    assert specialized[1] is None and generic[1] is None
+    assert specialized[0].payload == generic[0].payload == {"name": "ANA", "seen": True}
+    assert [m.payload for m in batched] == [specialized[0].payload]
+
+
+@pytest.mark.asyncio
+async def test_process_stream_stops_workers_when_input_fails():
+    """Test that a failing input iterable ends the stream without leaving workers behind."""
+    
+    class SlowFilter(FilterAgent):
+        async def filter(self, message: AgentMessage):
+            await asyncio.sleep(0.01)
+            return message
+    
+    pipeline = Pipeline([SlowFilter(AgentConfig(name="SlowFilter"))], max_concurrency=4)
+    
+    def messages():
+        for i in range(3):
+            yield AgentMessage(id=str(i), type=MessageType.EVENT, source="test", payload={})
+        raise RuntimeError("input failed")
+    
+    tasks_before = asyncio.all_tasks()
+    results = [result async for result in pipeline.process_stream(messages())]
+    
+    assert len(results) <= 3
+    assert asyncio.all_tasks() == tasks_before
+
+
+@pytest.mark.asyncio
+async def test_process_batch_respects_filter_override_in_subclass():
+    """Test that a subclass overriding only filter is not bypassed by the inherited filter_batch."""
+    
+    class PositiveAmountFilter(ValidationFilter):
+        async def filter(self, message: AgentMessage):
+            if message.payload["amount"] < 0:
+                return None
+            return await super().filter(message)
+    
+    pipeline = Pipeline([
+        PositiveAmountFilter(AgentConfig(name="PositiveAmount"), required_fields=["amount"])
+    ])
+    message = AgentMessage(id="neg", type=MessageType.EVENT, source="test", payload={"amount": -1})
+    
+    assert await pipeline.process(message) is None
+    assert await pipeline.process_batch([message]) == []
+
+
+@pytest.mark.asyncio
+async def test_process_and_process_batch_agree_after_changes():
+    """Test that runtime pass_through changes apply and both paths use the compiled filter list."""
+    validation_filter = ValidationFilter(AgentConfig(name="Validate"), required_fields=["name"])
+    pipeline = Pipeline([validation_filter])
+    message = AgentMessage(id="m", type=MessageType.EVENT, source="test", payload={})
+    
+    validation_filter.pass_through = True
+    assert (await pipeline.process(message)) is not None
+    assert len(await pipeline.process_batch([message])) == 1
+    
+    # Appending without compile() is ignored by both paths until recompiled
+    pipeline.filters.append(
+        ValidationFilter(AgentConfig(name="Strict"), required_fields=["email"])
+    )
+    assert (await pipeline.process(message)) is not None
+    assert len(await pipeline.process_batch([message])) == 1
+    
+    pipeline.compile()
+    assert (await pipeline.process(message)) is None
+    assert await pipeline.process_batch([message]) == []
@@ -0,0 +1,39 @@
+"""Tests for the Pipes and Filters service pipeline."""
+
+import pytest
+from pydantic import TypeAdapter
+from typing import Any, Dict
+
+pytest.importorskip("azure.ai.projects")
+
+from services.pipes_filters.main import ParallelPipeline, PipelineData
+
+
+class MetadataFilter:
+    """Filter stub that only records its status in the metadata."""
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    async def process(self, data: PipelineData) -> PipelineData:
+        data.metadata[f"{self.name}_status"] = "success"
+        data.add_transformation(self.name)
+        return data
+
+
+@pytest.mark.asyncio
+async def test_parallel_pipeline_returns_serializable_metadata():
+    """Test that parallel results expose plain, JSON-serializable metadata."""
+    pipeline = ParallelPipeline("Parallel")
+    pipeline.add_filter(MetadataFilter("first")).add_filter(MetadataFilter("second"))
+    
+    input_data = PipelineData(content="data", metadata={"source": "test"})
+    results = await pipeline.execute(input_data)
+    
+    assert [type(r.metadata) for r in results] == [dict, dict]
+    assert results[0].metadata == {"source": "test", "first_status": "success"}
+    assert results[1].metadata == {"source": "test", "second_status": "success"}
+    assert input_data.metadata == {"source": "test"}
+    
+    # Same shape the API puts into PipelineResponse
+    TypeAdapter(Dict[str, Any]).dump_json({"parallel_results": [r.metadata for r in results]})